@@ -0,0 +1,281 @@
+"""
+Benchmarks of the extraction hot paths on synthetic .OUT files.
+
+Each scenario runs in a fresh subprocess (best of --repeat runs), so the peak RSS
+reported for it is its own. Results can be saved as a JSON baseline and compared
+against on later runs:
+
+    python benchmarks/extraction.py [--nodes 500 --periods 5000 ...] --save baseline.json
+    python benchmarks/extraction.py --compare baseline.json [--tolerance 0.25]
+
+Scenarios:
+    parse        open every file (header parse + memory map)
+    extract      copy total_inflow of every named node out of each file
+    peaks        peak_statistics (5 peaks, 2 minima) on the extracted blocks
+    events       event_statistics (5 events, 2 minima) on the extracted blocks
+    table        build the typed long-format result tables from the statistics
+    export_csv / export_excel / export_parquet
+                 write the result tables (Parquet only with pyarrow installed)
+    end_to_end   extract_files + write_results to CSV with one worker
+    end_to_end_parallel
+                 the same with one worker per CPU
+
+Exits with status 1 when --compare finds a scenario slower than the tolerance allows.
+"""
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+import subprocess
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCHMARK_DIR)
+sys.path.insert(0, REPO_DIR)
+sys.path.insert(0, BENCHMARK_DIR)
+
+DEFAULT_DATA_DIR = os.path.join(BENCHMARK_DIR, "data")
+
+METRICS = ["1st Max", "2nd Max", "3rd Max", "Minimum"]
+NTH_MAX = 5
+NTH_MIN = 2
+
+SCENARIOS = ["parse", "extract", "peaks", "events", "table", "export_csv", "export_excel", "export_parquet",
+             "end_to_end", "end_to_end_parallel"]
+
+
+def peak_rss_mb():
+    """
+    Peak resident set size of this process and its finished children in MB,
+    None where the resource module is not available (Windows).
+    """
+    try:
+        import resource
+    except ImportError:
+        return None
+    usage = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+                resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+    return usage / 1024 ** 2 if sys.platform == "darwin" else usage / 1024
+
+
+def best_time(function, repeat):
+    """
+    Best wall time of `repeat` calls of `function`, and its last return value.
+    """
+    best = None
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def run_scenario(name, out_files, names_path, repeat, work_dir):
+    """
+    Runs one scenario in this process.
+    Returns {"seconds", "items", "unit"}; throughput is items / seconds.
+    """
+    import numpy as np
+    from swmm_io import open_results_map
+    from swmm_stats import peak_statistics, event_statistics, EventDefinition
+    from swmm_extraction import (read_node_names, metric_objectives, objective_names, max_rank, extract_files,
+                                 STATUS_OK, STATUS_NOT_AVAILABLE)
+    from swmm_export import result_table, write_results
+
+    names = read_node_names(names_path)
+    n_names = len(names) * len(out_files)
+
+    def open_all():
+        return [open_results_map(path) for path in out_files]
+
+    if name == "parse":
+        seconds, _ = best_time(open_all, repeat)
+        return {"seconds": seconds, "items": len(out_files), "unit": "files"}
+
+    results_maps = open_all()
+
+    def extract_all():
+        return [results_map.block("node", names, "total_inflow") for results_map in results_maps]
+
+    if name == "extract":
+        seconds, blocks = best_time(extract_all, repeat)
+        return {"seconds": seconds, "items": sum(block.shape[1] for _, block in blocks), "unit": "series"}
+
+    blocks = extract_all()
+
+    def statistics_all():
+        return [peak_statistics(block, n_max=max_rank(METRICS, NTH_MAX), n_min=NTH_MIN) for _, block in blocks]
+
+    if name == "peaks":
+        seconds, _ = best_time(statistics_all, repeat)
+        return {"seconds": seconds, "items": sum(block.shape[1] for _, block in blocks), "unit": "series"}
+
+    if name == "events":
+        events = EventDefinition(0.0, 1.0)
+        step_seconds = results_maps[0].output.report_interval.total_seconds()
+        seconds, _ = best_time(lambda: [event_statistics(block, events, step_seconds, n_max=NTH_MAX, n_min=NTH_MIN)
+                                        for _, block in blocks], repeat)
+        return {"seconds": seconds, "items": sum(block.shape[1] for _, block in blocks), "unit": "series"}
+
+    statistics = statistics_all()
+    objectives = objective_names(METRICS, NTH_MAX, NTH_MIN)
+
+    def tables_all():
+        tables = []
+        for path, (found_names, block), stats in zip(out_files, blocks, statistics):
+            columns = metric_objectives(stats, block.shape[0], METRICS, NTH_MAX, NTH_MIN)
+            values = np.column_stack([values for _, values, _ in columns])
+            available = np.column_stack([available for _, _, available in columns])
+            tables.append(result_table(found_names, os.path.basename(path), objectives,
+                                       np.where(available, values, np.nan),
+                                       np.where(available, STATUS_OK, STATUS_NOT_AVAILABLE),
+                                       "node", "total_inflow"))
+        return tables
+
+    if name == "table":
+        seconds, tables = best_time(tables_all, repeat)
+        return {"seconds": seconds, "items": sum(len(table) for table in tables), "unit": "rows"}
+
+    tables = tables_all()
+    n_rows = sum(len(table) for table in tables)
+
+    if name.startswith("export_"):
+        output_format, extension = {"export_csv": ("CSV", ".csv"), "export_excel": ("Excel", ".xlsx"),
+                                    "export_parquet": ("Parquet", ".parquet")}[name]
+        if output_format == "Parquet":
+            try:
+                import pyarrow  # noqa: F401
+            except ImportError:
+                return None
+        save_path = os.path.join(work_dir, f"benchmark_results{extension}")
+        seconds, _ = best_time(lambda: write_results(tables, save_path, output_format), repeat)
+        os.remove(save_path)
+        return {"seconds": seconds, "items": n_rows, "unit": "rows"}
+
+    if name in ("end_to_end", "end_to_end_parallel"):
+        workers = 1 if name == "end_to_end" else os.cpu_count() or 1
+        save_path = os.path.join(work_dir, "benchmark_results.csv")
+        seconds, _ = best_time(lambda: write_results(
+            extract_files(out_files, names, METRICS, nth_max_value=NTH_MAX, nth_min_value=NTH_MIN, workers=workers),
+            save_path, "CSV"), repeat)
+        os.remove(save_path)
+        return {"seconds": seconds, "items": n_names, "unit": "names"}
+
+    raise ValueError(f"Unknown scenario '{name}'")
+
+
+def run_isolated(name, args):
+    """
+    Runs one scenario in a subprocess and returns its result with throughput and peak RSS.
+    """
+    command = [sys.executable, os.path.abspath(__file__), "--run-scenario", name,
+               "--data-dir", args.data_dir, "--files", str(args.files), "--subcatchments", str(args.subcatchments),
+               "--nodes", str(args.nodes), "--links", str(args.links), "--periods", str(args.periods),
+               "--repeat", str(args.repeat)]
+    completed = subprocess.run(command, capture_output=True, text=True)
+    if completed.returncode != 0:
+        raise RuntimeError(f"Scenario {name} failed:\n{completed.stderr}")
+    result = json.loads(completed.stdout.strip().splitlines()[-1])
+    if result is not None:
+        result["throughput"] = result["items"] / result["seconds"] if result["seconds"] > 0 else None
+    return result
+
+
+def environment(args, out_files):
+    import numpy
+    import pandas
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "numpy": numpy.__version__,
+        "pandas": pandas.__version__,
+        "dataset": {"files": args.files, "subcatchments": args.subcatchments, "nodes": args.nodes,
+                    "links": args.links, "periods": args.periods,
+                    "mb_per_file": os.path.getsize(out_files[0]) / 1024 ** 2},
+    }
+
+
+def compare(results, baseline, tolerance):
+    """
+    Prints the change against a baseline; returns the scenarios slower than 1 + tolerance.
+    """
+    regressions = []
+    print(f"\n{'scenario':<22}{'baseline s':>12}{'now s':>12}{'ratio':>8}")
+    for name, result in results.items():
+        before = baseline.get("results", {}).get(name)
+        if result is None or before is None:
+            continue
+        ratio = result["seconds"] / before["seconds"] if before["seconds"] > 0 else float("inf")
+        flag = ""
+        if ratio > 1 + tolerance:
+            regressions.append(name)
+            flag = "  SLOWER"
+        print(f"{name:<22}{before['seconds']:>12.4f}{result['seconds']:>12.4f}{ratio:>8.2f}{flag}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--data-dir", default=DEFAULT_DATA_DIR,
+                        help="where the synthetic files are generated and reused (default: benchmarks/data)")
+    parser.add_argument("--files", type=int, default=4)
+    parser.add_argument("--subcatchments", type=int, default=10)
+    parser.add_argument("--nodes", type=int, default=500)
+    parser.add_argument("--links", type=int, default=250)
+    parser.add_argument("--periods", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=3, help="best of N runs per scenario")
+    parser.add_argument("--scenario", action="append", choices=SCENARIOS, help="run only these scenarios")
+    parser.add_argument("--save", metavar="JSON", help="write the results as a baseline")
+    parser.add_argument("--compare", metavar="JSON", help="compare against a saved baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="allowed slowdown against the baseline (default: 0.25 = 25%%)")
+    parser.add_argument("--run-scenario", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    from synthetic_out import write_dataset
+
+    out_files, names_path = write_dataset(args.data_dir, args.files, args.subcatchments, args.nodes,
+                                          args.links, args.periods)
+
+    if args.run_scenario:
+        result = run_scenario(args.run_scenario, out_files, names_path, args.repeat, args.data_dir)
+        if result is not None:
+            result["peak_rss_mb"] = peak_rss_mb()
+        print(json.dumps(result))
+        return 0
+
+    results = {}
+    print(f"{'scenario':<22}{'seconds':>10}{'throughput':>22}{'peak RSS':>12}")
+    for name in args.scenario or SCENARIOS:
+        result = run_isolated(name, args)
+        results[name] = result
+        if result is None:
+            print(f"{name:<22}{'skipped':>10}")
+            continue
+        rss = f"{result['peak_rss_mb']:.0f} MB" if result["peak_rss_mb"] is not None else "n/a"
+        throughput = f"{result['throughput']:,.0f} {result['unit']}/s"
+        print(f"{name:<22}{result['seconds']:>10.4f}{throughput:>22}{rss:>12}")
+
+    report = {"environment": environment(args, out_files), "results": results}
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nBaseline written to {args.save}")
+
+    if args.compare:
+        with open(args.compare, 'r') as f:
+            baseline = json.load(f)
+        if baseline.get("environment", {}).get("dataset") != report["environment"]["dataset"]:
+            print("\nWarning: the baseline was recorded on a different dataset")
+        if compare(results, baseline, args.tolerance):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
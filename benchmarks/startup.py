@@ -0,0 +1,109 @@
+"""
+Startup-time guard for the GUI.
+
+Checks that importing data_Extraction stays within an import-time budget
+(measured with `python -X importtime`), that none of the heavy modules are
+loaded before the main window exists, and, when a display is available,
+how long it takes until the main window is built and responsive.
+
+    python benchmarks/startup.py [--import-budget-ms 250] [--window-budget-ms 1500]
+
+Exits with status 1 when a budget is exceeded or a heavy module is imported eagerly.
+"""
+import os
+import re
+import sys
+import time
+import argparse
+import subprocess
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules that must only be loaded once a visualization or extraction needs them
+LAZY_MODULES = ["numpy", "pandas", "scipy", "swmm_api", "matplotlib", "bokeh"]
+
+WINDOW_SCRIPT = """
+import tkinter as tk
+import data_Extraction
+root = tk.Tk()
+app = data_Extraction.SWMMApp(root)
+root.update()
+print("READY", flush=True)
+root.destroy()
+"""
+
+
+def measure_imports(runs):
+    """
+    Runs `python -X importtime -c "import data_Extraction"` `runs` times.
+    Returns (best cumulative import time of data_Extraction in ms, set of loaded top-level modules).
+    """
+    best_us = None
+    loaded = set()
+    for _ in range(runs):
+        completed = subprocess.run([sys.executable, "-X", "importtime", "-c", "import data_Extraction"],
+                                   cwd=REPO_DIR, capture_output=True, text=True, check=True)
+        for line in completed.stderr.splitlines():
+            match = re.match(r"import time:\s+\d+ \|\s+(\d+) \|(\s*)(\S+)", line)
+            if not match:
+                continue
+            cumulative_us, module = int(match.group(1)), match.group(3)
+            loaded.add(module.split(".")[0])
+            if module == "data_Extraction":
+                best_us = cumulative_us if best_us is None else min(best_us, cumulative_us)
+    return best_us / 1000.0, loaded
+
+
+def measure_window(runs):
+    """
+    Wall time in ms from interpreter launch until the main window has been built and
+    processed its first events (best of `runs`). None when no display is available.
+    """
+    best = None
+    for _ in range(runs):
+        start = time.perf_counter()
+        process = subprocess.Popen([sys.executable, "-c", WINDOW_SCRIPT], cwd=REPO_DIR,
+                                   stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+        line = process.stdout.readline()
+        elapsed = (time.perf_counter() - start) * 1000.0
+        process.communicate()
+        if not line.startswith("READY"):
+            return None
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--import-budget-ms", type=float, default=250.0)
+    parser.add_argument("--window-budget-ms", type=float, default=1500.0)
+    parser.add_argument("--runs", type=int, default=3, help="best of N runs")
+    args = parser.parse_args(argv)
+
+    failed = False
+
+    import_ms, loaded = measure_imports(args.runs)
+    print(f"import data_Extraction: {import_ms:.1f} ms (budget {args.import_budget_ms:.0f} ms)")
+    if import_ms > args.import_budget_ms:
+        failed = True
+        print("  FAIL: import-time budget exceeded")
+
+    eager = sorted(set(LAZY_MODULES) & loaded)
+    if eager:
+        failed = True
+        print(f"  FAIL: imported before the window exists: {', '.join(eager)}")
+
+    window_ms = measure_window(args.runs)
+    if window_ms is None:
+        print("main window: skipped (no display available)")
+    else:
+        print(f"main window interactive: {window_ms:.1f} ms (budget {args.window_budget_ms:.0f} ms)")
+        if window_ms > args.window_budget_ms:
+            failed = True
+            print("  FAIL: time-to-window budget exceeded")
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,151 @@
+"""
+Synthetic SWMM binary output (.OUT) files for benchmarks.
+
+Writes files in the SWMM 5.1 binary layout (no pollutants) with configurable numbers of
+subcatchments, nodes, links and report periods, plus a matching Excel name list.
+Result values are smooth random hydrographs, so every series has many peaks.
+
+    python benchmarks/synthetic_out.py OUT_DIR [--files 4] [--nodes 500] [--links 250] [--periods 5000]
+"""
+import os
+import sys
+import struct
+import argparse
+import numpy as np
+
+MAGIC_NUMBER = 516114522
+SWMM_VERSION = 51015
+
+# Result variables per element in SWMM 5.1 without pollutants
+SUBCATCHMENT_VARIABLES = 8
+NODE_VARIABLES = 6
+LINK_VARIABLES = 5
+SYSTEM_VARIABLES = 15
+
+# Days between the SWMM epoch (1899-12-30) and 2023-01-01
+START_DATE = 44927.0
+
+# Report periods generated and written per step, bounds memory for large files
+WRITE_CHUNK_PERIODS = 1024
+
+
+def element_names(n_subcatchments, n_nodes, n_links):
+    """
+    Names used for the generated elements: S0.., J0.., C0..
+    """
+    return ([f"S{i}" for i in range(n_subcatchments)], [f"J{i}" for i in range(n_nodes)],
+            [f"C{i}" for i in range(n_links)])
+
+
+def write_out_file(path, n_subcatchments=10, n_nodes=500, n_links=250, n_periods=5000, report_step=300, seed=0):
+    """
+    Writes one synthetic .OUT file and returns its size in bytes.
+    """
+    rng = np.random.default_rng(seed)
+    subcatchments, nodes, links = element_names(n_subcatchments, n_nodes, n_links)
+    n_values = (n_subcatchments * SUBCATCHMENT_VARIABLES + n_nodes * NODE_VARIABLES +
+                n_links * LINK_VARIABLES + SYSTEM_VARIABLES)
+    record = np.dtype([("datetime", "<f8"), ("values", "<f4", (n_values,))])
+
+    with open(path, 'wb') as f:
+        def pack(fmt, *values):
+            f.write(struct.pack(fmt, *values))
+
+        # Opening records: magic number, version, flow units, object counts
+        pack('<7i', MAGIC_NUMBER, SWMM_VERSION, 0, n_subcatchments, n_nodes, n_links, 0)
+
+        # Object IDs
+        pos_labels = f.tell()
+        for name in subcatchments + nodes + links:
+            encoded = name.encode('ascii')
+            pack('<i', len(encoded))
+            f.write(encoded)
+
+        # Object properties: subcatchment area; node type, invert, max depth;
+        # link type, offsets, max depth, length
+        pos_input = f.tell()
+        pack('<2i', 1, 1)
+        f.write(np.ones(n_subcatchments, dtype='<f4').tobytes())
+        pack('<4i', 3, 0, 2, 3)
+        f.write(np.zeros(n_nodes, dtype=[("type", "<i4"), ("invert", "<f4"), ("depth", "<f4")]).tobytes())
+        pack('<6i', 5, 0, 4, 4, 3, 5)
+        f.write(np.zeros(n_links, dtype=[("type", "<i4"), ("properties", "<f4", (4,))]).tobytes())
+
+        # Reporting variables of each object kind
+        for n_variables in (SUBCATCHMENT_VARIABLES, NODE_VARIABLES, LINK_VARIABLES, SYSTEM_VARIABLES):
+            pack('<i', n_variables)
+            pack(f'<{n_variables}i', *range(n_variables))
+
+        pack('<d', START_DATE)
+        pack('<i', report_step)
+
+        # Results: one record per report period
+        pos_output = f.tell()
+        phase = rng.uniform(0, 2 * np.pi, n_values).astype(np.float32)
+        period = rng.uniform(50, 500, n_values).astype(np.float32)
+        chunk = np.empty(WRITE_CHUNK_PERIODS, dtype=record)
+        for start in range(0, n_periods, WRITE_CHUNK_PERIODS):
+            stop = min(start + WRITE_CHUNK_PERIODS, n_periods)
+            t = np.arange(start, stop, dtype=np.float32)[:, None]
+            part = chunk[:stop - start]
+            part["datetime"] = START_DATE + (np.arange(start, stop) + 1) * report_step / 86400.0
+            part["values"] = 5 * np.sin(t / period + phase) + rng.random((stop - start, n_values), dtype=np.float32)
+            f.write(part.tobytes())
+
+        # Closing records
+        pack('<6i', pos_labels, pos_input, pos_output, n_periods, 0, MAGIC_NUMBER)
+        return f.tell()
+
+
+def write_name_list(path, names):
+    """
+    Writes the Excel sheet with a `Name` column read by the extractor.
+    """
+    import pandas as pd
+    pd.DataFrame({"Name": names}).to_excel(path, index=False)
+
+
+def write_dataset(out_dir, n_files=4, n_subcatchments=10, n_nodes=500, n_links=250, n_periods=5000,
+                  missing_fraction=0.02):
+    """
+    Writes `n_files` .OUT files and a name list with every node plus a few names
+    that are in none of the files. Files that already exist with the expected size
+    are reused. Returns (list of .OUT paths, path of the name list).
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    tag = f"s{n_subcatchments}_n{n_nodes}_l{n_links}_p{n_periods}"
+    out_files = []
+    for i in range(n_files):
+        path = os.path.join(out_dir, f"synthetic_{tag}_{i}.out")
+        if not os.path.exists(path):
+            write_out_file(path + ".tmp", n_subcatchments, n_nodes, n_links, n_periods, seed=i)
+            os.replace(path + ".tmp", path)
+        out_files.append(path)
+
+    names_path = os.path.join(out_dir, f"names_{tag}.xlsx")
+    if not os.path.exists(names_path):
+        _, nodes, _ = element_names(n_subcatchments, n_nodes, n_links)
+        missing = [f"MISSING{i}" for i in range(int(n_nodes * missing_fraction))]
+        write_name_list(names_path, nodes + missing)
+    return out_files, names_path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("out_dir")
+    parser.add_argument("--files", type=int, default=4)
+    parser.add_argument("--subcatchments", type=int, default=10)
+    parser.add_argument("--nodes", type=int, default=500)
+    parser.add_argument("--links", type=int, default=250)
+    parser.add_argument("--periods", type=int, default=5000)
+    args = parser.parse_args(argv)
+
+    out_files, names_path = write_dataset(args.out_dir, args.files, args.subcatchments, args.nodes,
+                                          args.links, args.periods)
+    for path in out_files + [names_path]:
+        print(f"{path} ({os.path.getsize(path) / 1024 ** 2:.1f} MB)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -3,44 +3,95 @@ import json
 import tkinter as tk
 from tkinter import filedialog, messagebox, ttk, colorchooser
 from datetime import datetime
-from bokeh.plotting import figure
-from bokeh.io import save, export_png
-from bokeh.resources import CDN
-from bokeh.embed import file_html
-from bokeh.models import Legend
+import queue
 import threading
 import logging
-import pandas as pd
-from swmm_api import SwmmOutput
-from scipy.signal import find_peaks
-import numpy as np
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg, NavigationToolbar2Tk
+from functools import partial
+from swmm_widgets import SearchableSelector
+from swmm_options import (METRIC_OPTIONS, EXPORT_EXTENSIONS, EXTRACTION_VARIABLES, DEFAULT_VARIABLES, EVENT_THRESHOLD,
+                          MIN_INTER_EVENT_HOURS, default_workers)
+
+# pandas, numpy, swmm_api, matplotlib and bokeh are imported inside the methods that
+# need them, so the main window appears without waiting for them to load.
+# benchmarks/startup.py guards this.
 
 # Logging configuration
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
+# Initial size of the main window; it grows when its widgets need more room
+DEFAULT_WINDOW_WIDTH = 900
+DEFAULT_WINDOW_HEIGHT = 600
+
 # Define a consistent color palette
 BG_COLOR = "#2E2E2E"
 FG_COLOR = "white"
 BUTTON_COLOR = "#4A4A4A"
 HOVER_COLOR = "#6A6A6A"
 
+# Budget of the opened-output cache shared by extraction and visualization
+OUTPUT_CACHE_ENTRIES = 16
+OUTPUT_CACHE_BYTES = 8 * 1024 ** 3  # mapped result bytes, not resident memory
+
+# How often the main loop checks a running extraction or loader for progress
+PROGRESS_POLL_MS = 100
+
+# Threads reading .OUT files for the visualization windows
+LOADER_THREADS = 4
+
+# Series kept by the Previous/Next navigator: the one shown, its neighbours and a few recent ones
+NAVIGATOR_CACHE_ENTRIES = 8
+
+# Report periods read at a time by the low-memory streaming extraction
+STREAM_PERIODS = 8192
+
+
+def format_duration(seconds):
+    """
+    Short human-readable duration, e.g. "2h 05m", "3m 07s" or "12s".
+    """
+    seconds = int(round(seconds))
+    hours, rest = divmod(seconds, 3600)
+    minutes, seconds = divmod(rest, 60)
+    if hours:
+        return f"{hours}h {minutes:02d}m"
+    if minutes:
+        return f"{minutes}m {seconds:02d}s"
+    return f"{seconds}s"
+
+
 class SWMMApp:
     def __init__(self, root):
         self.root = root
         self.root.title("SWMM Data Extraction Tool")
-        self.root.geometry("900x600")
+        self.root.geometry(f"{DEFAULT_WINDOW_WIDTH}x{DEFAULT_WINDOW_HEIGHT}")
         self.root.configure(bg=BG_COLOR)
 
         self.out_file_paths = []
         self.excel_file_path = ""
-        self.max_options = ["1st Max", "2nd Max", "3rd Max", "4th Max", "5th Max", "Minimum"]
+        self.max_options = list(METRIC_OPTIONS)
         self.selected_options = {option: tk.BooleanVar(value=False) for option in self.max_options}
         self.nth_max_var = tk.BooleanVar(value=False)
         self.nth_min_var = tk.BooleanVar(value=False)
         self.nth_max_value_var = tk.IntVar(value=1)
         self.nth_min_value_var = tk.IntVar(value=1)
+        self.workers_var = tk.IntVar(value=default_workers())
+        self.selected_variables = {pair: tk.BooleanVar(value=pair in DEFAULT_VARIABLES) for pair in EXTRACTION_VARIABLES}
+        self._output_cache = None
+        self._overlay_server = None
+        self.extraction_job = None
+        self._loader_pool = None
+        self._header_index = None
+        self._name_check = None
+        self._output_cache_lock = threading.Lock()
+        self.series_cache_var = tk.BooleanVar(value=False)
+        self.timing_report_var = tk.BooleanVar(value=False)
+        self.incremental_var = tk.BooleanVar(value=False)
+        self.window_start_var = tk.StringVar(value="")
+        self.window_end_var = tk.StringVar(value="")
+        self.streaming_var = tk.BooleanVar(value=False)
+        self.events_var = tk.BooleanVar(value=False)
+        self.event_threshold_var = tk.DoubleVar(value=EVENT_THRESHOLD)
+        self.min_inter_event_var = tk.DoubleVar(value=MIN_INTER_EVENT_HOURS)
         self.create_widgets()
 
     def create_widgets(self):
@@ -57,6 +108,8 @@ class SWMMApp:
 
         tk.Button(self.root, text="Browse Excel File", command=self.browse_excel_file, bg=BUTTON_COLOR, fg=FG_COLOR).grid(row=1, column=0, padx=10, pady=10)
 
+        tk.Button(self.root, text="Show Missing Names", command=self.show_missing_names, bg=BUTTON_COLOR, fg=FG_COLOR).grid(row=1, column=2, padx=10, pady=10)
+
         # Checkboxes for max/min options
         checkbox_frame = tk.Frame(self.root, bg=BG_COLOR)
         checkbox_frame.grid(row=2, column=0, columnspan=3, pady=10)
@@ -64,6 +117,12 @@ class SWMMApp:
         for i, option in enumerate(self.max_options):
             tk.Checkbutton(checkbox_frame, text=option, variable=self.selected_options[option], bg=BG_COLOR, fg=FG_COLOR, selectcolor=BUTTON_COLOR).grid(row=i // 3, column=i % 3, padx=5, pady=5)
 
+        # Element types and variables to extract, all read in the same pass over each file
+        variable_row = (len(self.max_options) + 2) // 3
+        tk.Label(checkbox_frame, text="Extract variables:", bg=BG_COLOR, fg=FG_COLOR).grid(row=variable_row, column=0, columnspan=3, padx=5, pady=(10, 0))
+        for i, (kind, variable) in enumerate(EXTRACTION_VARIABLES):
+            tk.Checkbutton(checkbox_frame, text=f"{kind.capitalize()} {variable.replace('_', ' ')}", variable=self.selected_variables[(kind, variable)], bg=BG_COLOR, fg=FG_COLOR, selectcolor=BUTTON_COLOR).grid(row=variable_row + 1 + i // 3, column=i % 3, padx=5, pady=5)
+
         # Inline configuration for nth maximum and nth minimum
         nth_frame = tk.Frame(self.root, bg=BG_COLOR)
         nth_frame.grid(row=3, column=0, columnspan=3, pady=10)
@@ -78,26 +137,102 @@ class SWMMApp:
         tk.Label(nth_frame, text="n =", bg=BG_COLOR, fg=FG_COLOR).grid(row=1, column=1, padx=5, pady=5)
         tk.Spinbox(nth_frame, from_=1, to=100, textvariable=self.nth_min_value_var, bg=BUTTON_COLOR, fg=FG_COLOR, width=5).grid(row=1, column=2, padx=5, pady=5)
 
+        # Less common settings, in a side column that is hidden until asked for, so the
+        # main actions stay in view
+        self.advanced_button = tk.Button(nth_frame, text="Advanced options \u25b8", command=self.toggle_advanced_options,
+                                         bg=BUTTON_COLOR, fg=FG_COLOR)
+        self.advanced_button.grid(row=2, column=0, columnspan=3, padx=5, pady=5)
+        advanced_frame = self.advanced_frame = tk.Frame(self.root, bg=BG_COLOR)
+        advanced_frame.grid(row=0, column=3, rowspan=9, sticky='n', padx=10, pady=10)
+        advanced_frame.grid_remove()
+
+        # Parallel extraction workers (one .OUT file per process)
+        tk.Label(advanced_frame, text="Worker processes:", bg=BG_COLOR, fg=FG_COLOR).grid(row=0, column=0, padx=5, pady=5)
+        tk.Spinbox(advanced_frame, from_=1, to=64, textvariable=self.workers_var, bg=BUTTON_COLOR, fg=FG_COLOR, width=5).grid(row=0, column=2, padx=5, pady=5)
+
+        # On-disk cache of decoded series (".swmm_cache" next to the .OUT files)
+        tk.Checkbutton(advanced_frame, text="Cache decoded series on disk", variable=self.series_cache_var,
+                       command=self.toggle_series_cache, bg=BG_COLOR, fg=FG_COLOR,
+                       selectcolor=BUTTON_COLOR).grid(row=1, column=0, columnspan=3, padx=5, pady=5)
+
+        # Per-stage timing report written next to the export and shown when done
+        tk.Checkbutton(advanced_frame, text="Write timing report", variable=self.timing_report_var, bg=BG_COLOR,
+                       fg=FG_COLOR, selectcolor=BUTTON_COLOR).grid(row=2, column=0, columnspan=3, padx=5, pady=5)
+
+        # Reuse the stored results of unchanged .OUT files from the last run to the same export
+        tk.Checkbutton(advanced_frame, text="Only re-extract new or changed files", variable=self.incremental_var,
+                       bg=BG_COLOR, fg=FG_COLOR,
+                       selectcolor=BUTTON_COLOR).grid(row=3, column=0, columnspan=3, padx=5, pady=5)
+
+        # Optional time window for extraction and plots (empty = whole simulation)
+        tk.Label(advanced_frame, text="Window start:", bg=BG_COLOR, fg=FG_COLOR).grid(row=4, column=0, padx=5, pady=5)
+        tk.Entry(advanced_frame, textvariable=self.window_start_var, bg=BUTTON_COLOR, fg=FG_COLOR, width=18).grid(row=4, column=1, columnspan=2, padx=5, pady=5)
+        tk.Label(advanced_frame, text="Window end:", bg=BG_COLOR, fg=FG_COLOR).grid(row=5, column=0, padx=5, pady=5)
+        tk.Entry(advanced_frame, textvariable=self.window_end_var, bg=BUTTON_COLOR, fg=FG_COLOR, width=18).grid(row=5, column=1, columnspan=2, padx=5, pady=5)
+
+        # Running statistics over blocks of periods, for very long continuous simulations
+        tk.Checkbutton(advanced_frame, text="Low-memory streaming", variable=self.streaming_var, bg=BG_COLOR,
+                       fg=FG_COLOR, selectcolor=BUTTON_COLOR).grid(row=6, column=0, columnspan=3, padx=5, pady=5)
+
+        # Event-based peaks: the Max metrics rank independent events, with their volume and duration
+        tk.Checkbutton(advanced_frame, text="Event-based peaks", variable=self.events_var, bg=BG_COLOR, fg=FG_COLOR,
+                       selectcolor=BUTTON_COLOR).grid(row=7, column=0, columnspan=3, padx=5, pady=5)
+        tk.Label(advanced_frame, text="Event threshold:", bg=BG_COLOR, fg=FG_COLOR).grid(row=8, column=0, padx=5, pady=5)
+        tk.Entry(advanced_frame, textvariable=self.event_threshold_var, bg=BUTTON_COLOR, fg=FG_COLOR, width=8).grid(row=8, column=2, padx=5, pady=5)
+        tk.Label(advanced_frame, text="Min. inter-event time (h):", bg=BG_COLOR, fg=FG_COLOR).grid(row=9, column=0, padx=5, pady=5)
+        tk.Entry(advanced_frame, textvariable=self.min_inter_event_var, bg=BUTTON_COLOR, fg=FG_COLOR, width=8).grid(row=9, column=2, padx=5, pady=5)
+
         # Export format selection
         export_format_label = tk.Label(self.root, text="Select Export Format:", bg=BG_COLOR, fg=FG_COLOR)
         export_format_label.grid(row=4, column=0, padx=10, pady=10)
 
         self.export_format_var = tk.StringVar(value="Excel")
-        ttk.OptionMenu(self.root, self.export_format_var, "Excel", "Excel", "CSV", "TXT").grid(row=4, column=1, padx=10, pady=10)
+        ttk.OptionMenu(self.root, self.export_format_var, "Excel", "Excel", "CSV", "TXT", "Parquet").grid(row=4, column=1, padx=10, pady=10)
 
         # Visualization button
         tk.Button(self.root, text="Visualize Data", command=self.open_visualization_popup, bg=BUTTON_COLOR, fg=FG_COLOR).grid(row=5, column=1, padx=10, pady=10)
 
-        # Extraction button
-        tk.Button(self.root, text="Extract Data", command=self.start_extraction, bg=BUTTON_COLOR, fg=FG_COLOR).grid(row=5, column=0, padx=10, pady=10)
+        # Extraction and cancel buttons
+        self.extract_button = tk.Button(self.root, text="Extract Data", command=self.start_extraction, bg=BUTTON_COLOR, fg=FG_COLOR)
+        self.extract_button.grid(row=5, column=0, padx=10, pady=10)
+        self.cancel_button = tk.Button(self.root, text="Cancel", command=self.cancel_extraction, bg=BUTTON_COLOR, fg=FG_COLOR, state=tk.DISABLED)
+        self.cancel_button.grid(row=5, column=2, padx=10, pady=10)
 
-        # Progress bar
-        self.progress_bar = ttk.Progressbar(self.root, mode='indeterminate')
+        # Progress bar (one step per .OUT file) and status line
+        self.progress_bar = ttk.Progressbar(self.root, mode='determinate', length=300)
         self.progress_bar.grid(row=6, column=0, columnspan=3, pady=10, padx=10)
+        self.progress_label = tk.Label(self.root, text="", bg=BG_COLOR, fg=FG_COLOR)
+        self.progress_label.grid(row=7, column=0, columnspan=3, pady=(0, 10), padx=10)
+
+        # Result of checking the Excel names against the .OUT file headers
+        self.name_check_label = tk.Label(self.root, text="", bg=BG_COLOR, fg=FG_COLOR)
+        self.name_check_label.grid(row=8, column=0, columnspan=3, pady=(0, 10), padx=10)
+
+        self.fit_window()
+
+    def fit_window(self):
+        """
+        Grows the main window to the size its widgets request, never below the default
+        size and never beyond the screen.
+        """
+        self.root.update_idletasks()
+        width = min(max(DEFAULT_WINDOW_WIDTH, self.root.winfo_reqwidth()), self.root.winfo_screenwidth())
+        height = min(max(DEFAULT_WINDOW_HEIGHT, self.root.winfo_reqheight()), self.root.winfo_screenheight())
+        self.root.geometry(f"{width}x{height}")
+
+    def toggle_advanced_options(self):
+        if self.advanced_frame.winfo_manager():
+            self.advanced_frame.grid_remove()
+            self.advanced_button.config(text="Advanced options \u25b8")
+        else:
+            self.advanced_frame.grid()
+            self.advanced_button.config(text="Advanced options \u25be")
+        self.fit_window()
 
     def browse_out_files(self):
         self.out_file_paths = filedialog.askopenfilenames(filetypes=[("OUT files", "*.out")])
         self.out_file_label.config(text=f"{len(self.out_file_paths)} .OUT files selected" if self.out_file_paths else "No .OUT File Selected")
+        self.check_names()
 
     def show_selected_files(self):
         if not self.out_file_paths:
@@ -109,156 +244,324 @@ class SWMMApp:
     def browse_excel_file(self):
         self.excel_file_path = filedialog.askopenfilename(filetypes=[("Excel files", "*.xlsx;*.xls")])
         self.excel_file_label.config(text="Excel file selected" if self.excel_file_path else "No Excel File Selected")
+        self.check_names()
 
-    def start_extraction(self):
-        if not self.out_file_paths or not self.excel_file_path:
-            messagebox.showerror("Error", "Please select both .OUT and Excel files.")
+    @property
+    def header_index(self):
+        """
+        Header-only index of the .OUT files (names, variables, periods), created on first use.
+        """
+        if self._header_index is None:
+            from swmm_header import HeaderIndex
+            self._header_index = HeaderIndex()
+        return self._header_index
+
+    def check_names(self):
+        """
+        Reads the headers of the selected .OUT files on the loader pool and, when an
+        Excel file is selected, counts the names that no file or only some files
+        contain, for the element types of the selected variables. No results are read.
+        """
+        out_files = list(self.out_file_paths)
+        excel_file_path = self.excel_file_path
+        kinds = sorted({kind for (kind, _), var in self.selected_variables.items() if var.get()}) or ["node"]
+        self._name_check = None
+        if not out_files:
+            self.name_check_label.config(text="")
             return
+        if excel_file_path:
+            self.name_check_label.config(text="Checking names...")
 
-        thread = threading.Thread(target=self.extract_data)
-        thread.start()
+        header_index = self.header_index
 
-    def extract_data(self):
-        self.progress_bar.start()
+        def check():
+            # Runs on a loader thread, must not touch Tk
+            for file_path in out_files:
+                header_index.get(file_path)
+            if not excel_file_path:
+                return None
+            from swmm_extraction import read_node_names
+            names = read_node_names(excel_file_path)
+            return names, header_index.presence(names, out_files, kinds)
 
-        try:
-            selected_metrics = [key for key, var in self.selected_options.items() if var.get()]
-            nth_max_value = self.nth_max_value_var.get()
-            nth_min_value = self.nth_min_value_var.get()
-            enable_nth_max = self.nth_max_var.get()
-            enable_nth_min = self.nth_min_var.get()
-
-            if not selected_metrics and not enable_nth_max and not enable_nth_min:
-                messagebox.showerror("Error", "Please select at least one metric or enable nth max/min options.")
+        future = self.loader_pool.submit(check)
+
+        def poll():
+            if not future.done():
+                self.root.after(PROGRESS_POLL_MS, poll)
+                return
+            if out_files != list(self.out_file_paths) or excel_file_path != self.excel_file_path:
+                return  # the selection changed meanwhile, a newer check is running
+            try:
+                result = future.result()
+            except Exception as e:
+                logging.error(f"Could not check the names: {e}")
+                self.name_check_label.config(text=f"Could not check the names: {e}")
+                return
+            if result is None:
                 return
 
-            logging.info("Starting data extraction")
+            names, present = result
+            self._name_check = (names, out_files, kinds, present)
+            in_all = int(present.all(axis=1).sum())
+            in_none = int((~present.any(axis=1)).sum())
+            self.name_check_label.config(text=f"{len(names)} names: {in_all} in every file, "
+                                              f"{len(names) - in_all - in_none} missing from some files, "
+                                              f"{in_none} in no file")
 
-            df = pd.read_excel(self.excel_file_path)
-            node_names = df['Name'].tolist()
-            results = []
+        poll()
 
-            for out_file in self.out_file_paths:
-                output = self.parse_swmm_out_file(out_file)
-                if output is None:
-                    # Skip this .OUT file or record an error
-                    results.append({"Name": None, ".OUT file name": out_file, "Error": "Could not parse this file"})
-                    continue
+    def show_missing_names(self):
+        """
+        Lists, per .OUT file, the Excel names it does not contain (see check_names).
+        """
+        if self._name_check is None:
+            messagebox.showinfo("Missing Names", "Select the .OUT files and the Excel file first; "
+                                                 "the names are checked as soon as both are selected.")
+            return
 
-                out_file_name = out_file.split('/')[-1]
+        names, out_files, kinds, present = self._name_check
+        lines = [f"Element types checked: {', '.join(kinds)}", ""]
+        missing_everywhere = [str(name) for name, row in zip(names, present) if not row.any()]
+        if missing_everywhere:
+            lines += [f"In no file ({len(missing_everywhere)}):"] + [f"  {name}" for name in missing_everywhere] + [""]
+        for j, out_file in enumerate(out_files):
+            missing = [str(name) for name, row in zip(names, present) if row.any() and not row[j]]
+            if missing:
+                lines += [f"{os.path.basename(out_file)} ({len(missing)} missing):"] + [f"  {name}" for name in missing] + [""]
+        if len(lines) == 2:
+            lines.append("Every name is in every file.")
+        self.show_text_window("Missing Names", "\n".join(lines))
+
+    @property
+    def output_cache(self):
+        """
+        Opened-output cache shared by extraction and visualization, created on first use.
+        """
+        with self._output_cache_lock:
+            if self._output_cache is None:
+                from swmm_io import ResultsMapCache
+                self._output_cache = ResultsMapCache(max_entries=OUTPUT_CACHE_ENTRIES, max_bytes=OUTPUT_CACHE_BYTES)
+            return self._output_cache
+
+    @property
+    def overlay_server(self):
+        """
+        Local Bokeh server showing the comparative overlay, created on first use.
+        """
+        if self._overlay_server is None:
+            from swmm_plotting import OverlayServer
+            self._overlay_server = OverlayServer()
+        return self._overlay_server
 
-                for node_name in node_names:
-                    try:
-                        inflow_data = output.get_part('node', node_name, 'total_inflow')
+    def toggle_series_cache(self):
+        from swmm_io import SeriesSidecarCache
+        self.output_cache.sidecar = SeriesSidecarCache() if self.series_cache_var.get() else None
 
-                        if inflow_data is not None:
-                            inflow_list = inflow_data.tolist() if isinstance(inflow_data, np.ndarray) else inflow_data
-                            peaks, _ = find_peaks(inflow_list)
-                            peak_values = [inflow_list[i] for i in peaks]
-                            sorted_peaks = sorted(peak_values, reverse=True)
+    def time_window(self):
+        """
+        (start, end) datetimes from the window fields (main thread only); either is None
+        when its field is empty, and the result is None when both are.
+        Raises ValueError for a field that is not a date and time like "2023-05-01 06:00".
+        """
+        start, end = (self.window_start_var.get().strip(), self.window_end_var.get().strip())
+        if not start and not end:
+            return None
+        return (datetime.fromisoformat(start) if start else None, datetime.fromisoformat(end) if end else None)
 
-                            result = {"Name": node_name, ".OUT file name": out_file_name}
+    def start_extraction(self):
+        if not self.out_file_paths or not self.excel_file_path:
+            messagebox.showerror("Error", "Please select both .OUT and Excel files.")
+            return
 
-                            for metric in selected_metrics:
-                                if "Max" in metric:
-                                    index = int(metric.split(" ")[0][0]) - 1
-                                    result[metric] = sorted_peaks[index] if index < len(sorted_peaks) else "Not Available"
-                                elif metric == "Minimum":
-                                    result[metric] = min(inflow_list) if inflow_list else "Not Available"
+        if self.extraction_job is not None and self.extraction_job.is_alive():
+            messagebox.showinfo("Extraction", "An extraction is already running.")
+            return
 
-                            # Nth value processing
-                            if enable_nth_max:
-                                result[f"{nth_max_value}th Max"] = sorted_peaks[nth_max_value - 1] if nth_max_value <= len(sorted_peaks) else "Not Available"
-                            if enable_nth_min:
-                                result[f"{nth_min_value}th Min"] = sorted(inflow_list)[nth_min_value - 1] if nth_min_value <= len(inflow_list) else "Not Available"
+        self.extract_data()
 
-                            results.append(result)
+    def extract_data(self):
+        """
+        Collects the settings on the main thread and starts an ExtractionJob. The job
+        runs in the background and reports through its event queue, which
+        poll_extraction reads with root.after, so no Tk call is made off the main thread.
+        """
+        selected_metrics = [key for key, var in self.selected_options.items() if var.get()]
+        nth_max_value = self.nth_max_value_var.get()
+        nth_min_value = self.nth_min_value_var.get()
+        enable_nth_max = self.nth_max_var.get()
+        enable_nth_min = self.nth_min_var.get()
+        variables = [pair for pair, var in self.selected_variables.items() if var.get()]
+
+        if not selected_metrics and not enable_nth_max and not enable_nth_min:
+            messagebox.showerror("Error", "Please select at least one metric or enable nth max/min options.")
+            return
 
-                        else:
-                            results.append({"Name": node_name, ".OUT file name": out_file_name, "Status": "Data Not Found"})
+        if not variables:
+            messagebox.showerror("Error", "Please select at least one variable to extract.")
+            return
 
-                    except Exception as e:
-                        logging.error(f"Error processing node {node_name}: {e}")
-                        results.append({"Name": node_name, ".OUT file name": out_file_name, "Error": str(e)})
+        if (enable_nth_max and nth_max_value < 1) or (enable_nth_min and nth_min_value < 1):
+            messagebox.showerror("Error", "The nth maximum and nth minimum must be 1 or more.")
+            return
 
-            results_df = pd.DataFrame(results)
-            results_df = results_df.set_index(["Name", ".OUT file name"]).stack().reset_index()
-            results_df.columns = ["Name", ".OUT file name", "Objective", "Outcome"]
+        try:
+            window = self.time_window()
+        except ValueError as e:
+            messagebox.showerror("Error", f"Invalid time window: {e}")
+            return
 
-            output_format = self.export_format_var.get()
-            filetypes = []
-            extension = ""
+        events = None
+        if self.events_var.get():
+            try:
+                events = (self.event_threshold_var.get(), self.min_inter_event_var.get())
+            except tk.TclError:
+                messagebox.showerror("Error", "The event threshold and inter-event time must be numbers.")
+                return
 
-            if output_format == "Excel":
-                extension = ".xlsx"
-                filetypes = [("Excel files", "*.xlsx")]
-            elif output_format == "CSV":
-                extension = ".csv"
-                filetypes = [("CSV files", "*.csv")]
-            elif output_format == "TXT":
-                extension = ".txt"
-                filetypes = [("Text files", "*.txt")]
+        # Ask for the destination first, results are written while files are processed
+        output_format = self.export_format_var.get()
+        extension = EXPORT_EXTENSIONS.get(output_format, "")
+        filetypes = []
+
+        if output_format == "Excel":
+            filetypes = [("Excel files", "*.xlsx")]
+        elif output_format == "CSV":
+            filetypes = [("CSV files", "*.csv")]
+        elif output_format == "TXT":
+            filetypes = [("Text files", "*.txt")]
+        elif output_format == "Parquet":
+            filetypes = [("Parquet files", "*.parquet")]
+
+        save_path = filedialog.asksaveasfilename(defaultextension=extension, filetypes=filetypes)
+        if not save_path:
+            return
 
-            save_path = filedialog.asksaveasfilename(defaultextension=extension, filetypes=filetypes)
+        from swmm_extraction import ExtractionJob
+        from swmm_profiling import RunProfile
+        from swmm_stats import EventDefinition
+
+        logging.info("Starting data extraction")
+        self.extraction_job = ExtractionJob(self.out_file_paths, self.excel_file_path, save_path, output_format,
+                                            selected_metrics,
+                                            nth_max_value=nth_max_value if enable_nth_max else None,
+                                            nth_min_value=nth_min_value if enable_nth_min else None,
+                                            workers=self.workers_var.get(), cache=self.output_cache,
+                                            sidecar=self.output_cache.sidecar, variables=variables,
+                                            profile=RunProfile() if self.timing_report_var.get() else None,
+                                            incremental=self.incremental_var.get(),
+                                            windows=[window] if window else None,
+                                            stream_periods=STREAM_PERIODS if self.streaming_var.get() else None,
+                                            events=EventDefinition(*events) if events else None)
+
+        self.progress_bar.config(mode='determinate', maximum=len(self.out_file_paths), value=0)
+        self.progress_label.config(text="Reading names...")
+        self.extract_button.config(state=tk.DISABLED)
+        self.cancel_button.config(state=tk.NORMAL)
+        self.extraction_job.start()
+        self.root.after(PROGRESS_POLL_MS, self.poll_extraction)
+
+    def cancel_extraction(self):
+        if self.extraction_job is not None and self.extraction_job.is_alive():
+            self.extraction_job.cancel()
+            self.cancel_button.config(state=tk.DISABLED)
+            self.progress_label.config(text="Cancelling after the current file...")
+
+    def poll_extraction(self):
+        """
+        Drains the job's event queue on the Tk main loop and updates the progress display.
+        Re-schedules itself until the job has finished.
+        """
+        job = self.extraction_job
+        while True:
+            try:
+                kind, value = job.events.get_nowait()
+            except queue.Empty:
+                break
+
+            if kind == "progress":
+                self.progress_bar.config(value=value.files_done)
+                text = (f"{value.files_done}/{value.n_files} files, {value.nodes_done}/{value.n_nodes} nodes, "
+                        f"{value.rate:.1f} nodes/s")
+                if value.eta is not None and value.files_done < value.n_files:
+                    text += f", {format_duration(value.eta)} left"
+                self.progress_label.config(text=text)
+                continue
+            if kind == "profile":
+                self.show_timing_report(value)
+                continue
 
-            if save_path:
-                if output_format == "Excel":
-                    results_df.to_excel(save_path, index=False)
-                elif output_format == "CSV" or output_format == "TXT":
-                    results_df.to_csv(save_path, index=False)
+            self.extract_button.config(state=tk.NORMAL)
+            self.cancel_button.config(state=tk.DISABLED)
+            if kind == "done":
+                self.progress_label.config(text=f"Done, {value} rows written")
+                messagebox.showinfo("Success", f"Data saved to {job.save_path}")
+            elif kind == "cancelled":
+                self.progress_bar.config(value=0)
+                self.progress_label.config(text="Extraction cancelled")
+            else:
+                self.progress_label.config(text="Extraction failed")
+                messagebox.showerror("Error", f"An error occurred: {value}")
+            return
 
-                messagebox.showinfo("Success", f"Data saved to {save_path}")
+        self.root.after(PROGRESS_POLL_MS, self.poll_extraction)
 
-        except Exception as e:
-            logging.error(f"An error occurred during extraction: {e}")
-            messagebox.showerror("Error", f"An error occurred: {e}")
+    def show_timing_report(self, report_path):
+        """
+        Shows a timing report written by RunProfile in a read-only window.
+        """
+        try:
+            with open(report_path, 'r', encoding='utf-8') as f:
+                report = f.read()
+        except OSError as e:
+            messagebox.showerror("Error", f"Could not read the timing report: {e}")
+            return
+        self.show_text_window(f"Timing report - {os.path.basename(report_path)}", report)
 
-        finally:
-            self.progress_bar.stop()
+    def show_text_window(self, title, report):
+        """
+        Shows a block of monospaced text in a read-only, scrollable window.
+        """
+        report_window = tk.Toplevel(self.root)
+        report_window.title(title)
+        report_window.configure(bg=BG_COLOR)
+
+        text = tk.Text(report_window, wrap=tk.NONE, bg=BUTTON_COLOR, fg=FG_COLOR, font=("Courier", 10),
+                       width=100, height=30)
+        scrollbar = ttk.Scrollbar(report_window, orient=tk.VERTICAL, command=text.yview)
+        text.configure(yscrollcommand=scrollbar.set)
+        text.insert("1.0", report)
+        text.config(state=tk.DISABLED)
+        text.pack(side=tk.LEFT, fill='both', expand=True, padx=5, pady=5)
+        scrollbar.pack(side=tk.RIGHT, fill='y')
 
     def parse_swmm_out_file(self, file_path):
         """
-        Centralized method to parse a SWMM .OUT file using SwmmOutput.
-        Returns the SwmmOutput object or None on error.
+        Centralized method to parse the header of a SWMM .OUT file.
+        Goes through the shared output cache, so each file is only opened once.
+        Returns the swmm_header.OutFileHeader or None on error.
         """
-        try:
-            out = SwmmOutput(file_path)
-            return out
-        except Exception as e:
-            logging.error(f"[ERROR] Could not parse {file_path}: {e}")
-            return None
+        results_map = self.output_cache.get(file_path)
+        return results_map.output if results_map is not None else None
 
-    def load_swmm_timeseries(self, out_file, node_name):
+    def load_swmm_timeseries(self, out_file, node_name, window=None):
         """
         Loads the total_inflow time series for the given node from the specified .OUT file.
         Returns a Pandas DataFrame with DateTimeIndex and a single column named `node_name`,
         or None if the data is unavailable or there's an error.
+        The DateTimeIndex is built once per file (see swmm_io.time_index) and shared by all nodes.
+        With a (start, end) `window` only the report periods inside it are read.
         """
         try:
-            # We can either call parse_swmm_out_file or directly do SwmmOutput
-            # If parse_swmm_out_file returns None on error, handle that:
-            output_obj = self.parse_swmm_out_file(out_file)
-            if output_obj is None:
+            # The shared cache opens each file once, no matter how many nodes are loaded
+            results_map = self.output_cache.get(out_file)
+            if results_map is None:
                 return None
 
-            inflow_data = output_obj.get_part("node", node_name, "total_inflow")
+            periods = results_map.periods_between(*window) if window else None
+            inflow_data = results_map.get_series("node", node_name, "total_inflow", periods=periods)
             if inflow_data is not None and not inflow_data.empty:
-                df = inflow_data.to_frame(name=node_name)
-                # 1) Check if df.index is already datetime-like
-                if not pd.api.types.is_datetime64_any_dtype(df.index):
-                    # Let's assume the index is in hours from the start of simulation
-                    # or from some reference zero. If it's minutes, adjust accordingly.
-                    # If we have a known start date (like aggregator logic sets),
-                    # use that; otherwise, pick a fallback.
-
-                    fallback_start = datetime(2020, 1, 1)  # or any date that you prefer
-                    base_datetime = self.overlay_data_storage.get(out_file, {}).get("start_datetime") or fallback_start
-
-                    # Convert numeric index -> actual timestamps
-                    # Here we interpret each index entry as hours offset from 'base_datetime'
-                    numeric_hours = df.index.astype(float)  # ensure float, just in case
-                    df.index = [base_datetime + pd.Timedelta(hours=h) for h in numeric_hours]
-                return df
+                return inflow_data.to_frame(name=node_name)
             else:
                 return None
 
@@ -266,15 +569,104 @@ class SWMMApp:
             logging.error(f"Error loading timeseries for node {node_name} in {out_file}: {e}")
             return None
 
+    def plot_width(self):
+        """
+        Plot width chosen in the visualization popup (main thread only).
+        """
+        from swmm_plotting import DEFAULT_PLOT_WIDTH
+
+        try:
+            return self.plot_width_var.get()
+        except (AttributeError, tk.TclError):
+            return DEFAULT_PLOT_WIDTH
+
+    def decimate_for_plot(self, data, width=None):
+        """
+        Peak-preserving min/max decimation of a series to the plot width chosen in the
+        visualization popup, applied before the data is handed to matplotlib or Bokeh.
+        Loader threads must pass `width`, since Tk variables are only read on the main thread.
+        """
+        from swmm_plotting import decimate
+
+        return decimate(data, self.plot_width() if width is None else width)
+
+    @property
+    def loader_pool(self):
+        """
+        Thread pool that reads series for the visualization windows, created on first use.
+        Threads (not processes) share the opened-output cache with the main thread.
+        """
+        if self._loader_pool is None:
+            from concurrent.futures import ThreadPoolExecutor
+            self._loader_pool = ThreadPoolExecutor(max_workers=LOADER_THREADS, thread_name_prefix="loader")
+        return self._loader_pool
+
+    def load_files_async(self, file_paths, load, on_file, on_done=None, owner=None):
+        """
+        Runs load(file_path) for every file on the loader pool. on_file(file_path, result)
+        is called on the Tk main loop as results arrive, in the order of `file_paths`, and
+        on_done() after the last one; `load` itself must not touch Tk. Loading stops
+        early when the `owner` window is closed.
+        """
+        futures = [(file_path, self.loader_pool.submit(load, file_path)) for file_path in file_paths]
+
+        def poll():
+            if owner is not None and not owner.winfo_exists():
+                for _, future in futures:
+                    future.cancel()
+                return
+
+            while futures and futures[0][1].done():
+                file_path, future = futures.pop(0)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    logging.error(f"Error loading {file_path}: {e}")
+                    result = None
+                on_file(file_path, result)
+
+            if futures:
+                self.root.after(PROGRESS_POLL_MS, poll)
+            elif on_done is not None:
+                on_done()
+
+        poll()
+
+    def load_node_series(self, file_path, nodes, width, window=None):
+        """
+        Loader-thread part of the matplotlib views: the decimated total_inflow series of
+        every node in one file as {node: Series or None}, or None if the file cannot be opened.
+        """
+        if self.output_cache.get(file_path) is None:
+            return None
+        return {node: self.load_series(file_path, node, width, window) for node in nodes}
+
+    def load_series(self, file_path, node, width, window=None):
+        """
+        Loader-thread part of the sequential navigator: the decimated total_inflow series
+        of one node, or None if the file cannot be opened or the node is not in it.
+        `window` is the (start, end) read from time_window() on the main thread.
+        """
+        results_map = self.output_cache.get(file_path)
+        if results_map is None:
+            return None
+        periods = results_map.periods_between(*window) if window else None
+        inflow_data = results_map.get_series("node", node, "total_inflow", periods=periods)
+        if inflow_data is None or inflow_data.empty:
+            return None
+        return self.decimate_for_plot(inflow_data, width)
+
     def open_visualization_popup(self):
         """
         Opens a popup for selecting which .OUT files and nodes to visualize,
         then gives buttons to do Aggregated Visualization or Comparative Overlay.
         """
-        if not self.out_file_paths or not self.excel_file_path:
-            messagebox.showerror("Error", "Please select both .OUT and Excel files for visualization.")
+        if not self.out_file_paths:
+            messagebox.showerror("Error", "Please select .OUT files for visualization.")
             return
 
+        import pandas as pd
+
         popup = tk.Toplevel(self.root)
         popup.title("Select Graphs to Visualize")
         popup.configure(bg=BG_COLOR)
@@ -282,60 +674,29 @@ class SWMMApp:
         tk.Label(popup, text="Select Nodes and Files to Visualize", bg=BG_COLOR, fg=FG_COLOR).pack(pady=10)
 
         # -----------------------------------------------------------------
-        # 1) File checkboxes with Select All
+        # 1) File selector (searchable, selection kept in a set)
         # -----------------------------------------------------------------
-        file_frame = tk.Frame(popup, bg=BG_COLOR)
-        file_frame.pack(pady=5)
-
-        tk.Label(file_frame, text=".OUT Files:", bg=BG_COLOR, fg=FG_COLOR).grid(row=0, column=0, padx=5, pady=5)
-
-        self.file_vars = {}
-        for i, file_path in enumerate(self.out_file_paths):
-            var = tk.BooleanVar(value=False)
-            self.file_vars[file_path] = var
-            tk.Checkbutton(file_frame, text=file_path, variable=var, bg=BG_COLOR, fg=FG_COLOR,
-                           selectcolor=BUTTON_COLOR).grid(row=i + 1, column=0, sticky="w")
-
-        select_all_files_var = tk.BooleanVar(value=False)
-
-        def toggle_select_all_files():
-            for var in self.file_vars.values():
-                var.set(select_all_files_var.get())
-
-        tk.Checkbutton(file_frame, text="Select All", variable=select_all_files_var, command=toggle_select_all_files,
-                       bg=BG_COLOR, fg=FG_COLOR, selectcolor=BUTTON_COLOR).grid(row=len(self.out_file_paths) + 1,
-                                                                                column=0, sticky="w")
+        self.file_selector = SearchableSelector(popup, self.out_file_paths, ".OUT Files:", height=max(1, min(len(self.out_file_paths), 6)),
+                                                bg=BG_COLOR, fg=FG_COLOR, button_bg=BUTTON_COLOR)
+        self.file_selector.pack(pady=5, padx=10, fill='x')
 
         # -----------------------------------------------------------------
-        # 2) Node checkboxes with Select All
+        # 2) Node selector; only the rows matching the search are built
         # -----------------------------------------------------------------
-        node_frame = tk.Frame(popup, bg=BG_COLOR)
-        node_frame.pack(pady=5)
-
-        tk.Label(node_frame, text="Nodes:", bg=BG_COLOR, fg=FG_COLOR).grid(row=0, column=0, padx=5, pady=5)
-
-        self.node_vars = {}
-        try:
-            df = pd.read_excel(self.excel_file_path)
-            nodes = df['Name'].tolist()
-            for i, node in enumerate(nodes):
-                var = tk.BooleanVar(value=False)
-                self.node_vars[node] = var
-                tk.Checkbutton(node_frame, text=node, variable=var, bg=BG_COLOR, fg=FG_COLOR,
-                               selectcolor=BUTTON_COLOR).grid(row=i + 1, column=0, sticky="w")
-
-            select_all_nodes_var = tk.BooleanVar(value=False)
-
-            def toggle_select_all_nodes():
-                for var in self.node_vars.values():
-                    var.set(select_all_nodes_var.get())
-
-            tk.Checkbutton(node_frame, text="Select All", variable=select_all_nodes_var,
-                           command=toggle_select_all_nodes, bg=BG_COLOR, fg=FG_COLOR, selectcolor=BUTTON_COLOR).grid(
-                row=len(nodes) + 1, column=0, sticky="w")
+        # Without an Excel list, offer every node of the selected files, read from their headers
+        if self.excel_file_path:
+            try:
+                df = pd.read_excel(self.excel_file_path)
+                nodes = df['Name'].tolist()
+            except Exception as e:
+                messagebox.showerror("Error", f"Failed to load nodes from Excel: {e}")
+                nodes = []
+        else:
+            nodes = self.header_index.element_names("node", self.out_file_paths)
 
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to load nodes from Excel: {e}")
+        self.node_selector = SearchableSelector(popup, nodes, "Nodes:", height=12,
+                                                bg=BG_COLOR, fg=FG_COLOR, button_bg=BUTTON_COLOR)
+        self.node_selector.pack(pady=5, padx=10, fill='both', expand=True)
 
         # A frame to hold plot size entries
         size_frame = tk.Frame(popup, bg=BG_COLOR)
@@ -371,26 +732,27 @@ class SWMMApp:
 
         # ------------------ AGGREGATED VISUALIZATION --------------------
         def aggregated_visualization():
-            selected_files = [file for file, var in self.file_vars.items() if var.get()]
-            selected_nodes = [node for node, var in self.node_vars.items() if var.get()]
+            selected_files = self.file_selector.get_selected()
+            selected_nodes = self.node_selector.get_selected()
 
             if not selected_files or not selected_nodes:
                 messagebox.showerror("Error", "Please select at least one .OUT file and one node.")
                 return
 
             try:
-                fig, ax = plt.subplots(figsize=(10, 6))
-                for file_path in selected_files:
-                    output = SwmmOutput(file_path)
-                    for node in selected_nodes:
-                        inflow_data = output.get_part("node", node, "total_inflow")
-                        if inflow_data is not None and not inflow_data.empty:
-                            ax.plot(inflow_data, label=f"{node} ({file_path.split('/')[-1]})")
+                window = self.time_window()
+            except ValueError as e:
+                messagebox.showerror("Error", f"Invalid time window: {e}")
+                return
 
-                ax.set_title("Aggregated Inflow Data")
+            try:
+                import matplotlib.pyplot as plt
+                from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg, NavigationToolbar2Tk
+
+                fig, ax = plt.subplots(figsize=(10, 6))
+                ax.set_title("Aggregated Inflow Data (loading...)")
                 ax.set_xlabel("Time")
                 ax.set_ylabel("Flow")
-                ax.legend()
 
                 graph_window = tk.Toplevel(self.root)
                 graph_window.title("Aggregated Visualization")
@@ -405,6 +767,26 @@ class SWMMApp:
                 toolbar = NavigationToolbar2Tk(canvas, toolbar_frame)
                 toolbar.update()
 
+                # Lines are added as each file's series arrive from the loader pool
+                def add_file(file_path, node_series):
+                    if node_series is None:
+                        return
+                    for node in selected_nodes:
+                        inflow_data = node_series[node]
+                        if inflow_data is not None:
+                            ax.plot(inflow_data, label=f"{node} ({file_path.split('/')[-1]})")
+                    if ax.get_lines():
+                        ax.legend()
+                    canvas.draw_idle()
+
+                def all_loaded():
+                    ax.set_title("Aggregated Inflow Data")
+                    canvas.draw_idle()
+
+                self.load_files_async(selected_files, partial(self.load_node_series, nodes=selected_nodes,
+                                                              width=self.plot_width(), window=window),
+                                      add_file, all_loaded, owner=graph_window)
+
             except Exception as e:
                 messagebox.showerror("Error", f"Visualization error: {e}")
 
@@ -423,34 +805,31 @@ class SWMMApp:
             This is the simpler 'visualize' button that plots all selected
             nodes/files in a single sequential view (one at a time).
             """
-            selected_files = [file for file, var in self.file_vars.items() if var.get()]
-            selected_nodes = [node for node, var in self.node_vars.items() if var.get()]
+            selected_files = self.file_selector.get_selected()
+            selected_nodes = self.node_selector.get_selected()
 
             if not selected_files or not selected_nodes:
                 messagebox.showerror("Error", "Please select at least one .OUT file and one node.")
                 return
 
             try:
-                # Prepare graph data
-                graphs = []
-                for file_path in selected_files:
-                    output = self.parse_swmm_out_file(file_path)
-                    if output is None:
-                        # If parse failed, still append placeholders
-                        for node in selected_nodes:
-                            graphs.append((None, node, file_path))
-                        continue
+                window = self.time_window()
+            except ValueError as e:
+                messagebox.showerror("Error", f"Invalid time window: {e}")
+                return
 
-                    for node in selected_nodes:
-                        inflow_data = output.get_part("node", node, "total_inflow")
-                        if inflow_data is not None and not inflow_data.empty:
-                            graphs.append((inflow_data, node, file_path))
-                        else:
-                            graphs.append((None, node, file_path))
+            try:
+                import matplotlib.pyplot as plt
+                from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg, NavigationToolbar2Tk
 
-                if not graphs:
-                    messagebox.showerror("Error", "No data available for the selected nodes and files.")
-                    return
+                from swmm_plotting import SeriesPrefetcher
+
+                # Only (file, node) keys are kept; each series is loaded when it is shown and
+                # its neighbours are prefetched into a small bounded cache
+                graphs = [(file_path, node) for file_path in selected_files for node in selected_nodes]
+                series_cache = SeriesPrefetcher(self.loader_pool, partial(self.load_series, width=self.plot_width(),
+                                                                          window=window),
+                                                max_entries=NAVIGATOR_CACHE_ENTRIES)
 
                 # Create a new window for navigation
                 graph_window = tk.Toplevel(self.root)
@@ -472,8 +851,26 @@ class SWMMApp:
                 current_index = tk.IntVar(value=0)
 
                 def update_graph():
+                    if not graph_window.winfo_exists():
+                        return
+                    index = current_index.get()
+                    file_path, node = graphs[index]
+                    future = series_cache.get(graphs[index])
+                    series_cache.prefetch(graphs[max(index - 1, 0):index + 2])
+
                     ax.clear()
-                    inflow_data, node, file_path = graphs[current_index.get()]
+                    if not future.done():
+                        ax.set_title(f"Loading Node: {node}, File: {file_path.split('/')[-1]}...")
+                        canvas.draw()
+                        # Redraw once loaded, unless the user has moved on
+                        graph_window.after(PROGRESS_POLL_MS, lambda: index == current_index.get() and update_graph())
+                        return
+
+                    try:
+                        inflow_data = future.result()
+                    except Exception as e:
+                        logging.error(f"Error loading node {node} from {file_path}: {e}")
+                        inflow_data = None
                     if inflow_data is not None:
                         ax.plot(inflow_data, label=f"{node} ({file_path.split('/')[-1]})")
                         ax.set_title(f"Node: {node}, File: {file_path.split('/')[-1]}")
@@ -530,6 +927,16 @@ class SWMMApp:
         Opens a new window that allows overlay-based comparative visualization
         of multiple .OUT files for multiple nodes (one node at a time) using Bokeh.
         """
+        import pandas as pd
+        from bokeh.resources import CDN
+        from bokeh.embed import file_html
+        from swmm_plotting import series_columns, overlay_figure
+
+        try:
+            window = self.time_window()
+        except ValueError as e:
+            messagebox.showerror("Error", f"Invalid time window: {e}")
+            return
 
         # 1. Create Toplevel window
         popup = tk.Toplevel(self.root)
@@ -542,10 +949,8 @@ class SWMMApp:
         self.overlay_data_storage = {}
 
         # We also store user-chosen node names in a list
-        # (We'll rely on your existing "self.node_vars" if available,
-        #  or you can create a new selection UI. For now, let's assume
-        #  we already have selected_nodes.)
-        selected_nodes = [node for node, var in self.node_vars.items() if var.get()]
+        # (taken from the node selector of the visualization popup)
+        selected_nodes = self.node_selector.get_selected()
         if not selected_nodes:
             tk.messagebox.showerror("Error", "No nodes selected for comparative overlay.")
             popup.destroy()
@@ -565,7 +970,7 @@ class SWMMApp:
                 self.color_presets = {}
 
         # Collect selected files
-        selected_files = [f for f, var in self.file_vars.items() if var.get()]
+        selected_files = self.file_selector.get_selected()
         if not selected_files:
             tk.messagebox.showerror("Error", "No .OUT files selected for comparative overlay.")
             popup.destroy()
@@ -581,35 +986,39 @@ class SWMMApp:
         # We'll store references to color and shift entries for each file
         self.file_config_entries = {}
 
-        # Pre-load data & create a DataFrame with DateTimeIndex for each file
-        # Also handle downsampling if > 1 million points
-        for out_file in selected_files:
+        # Pre-load data & create a DataFrame with DateTimeIndex for each file.
+        # Files are read on the loader pool; each file's row appears as soon as it is loaded.
+        # Series are decimated to the plot width (min/max per pixel) so peaks stay exact
+        width = self.plot_width()
+
+        def load_overlay_file(out_file):
+            # Runs on a loader thread, must not touch Tk
             output_obj = self.parse_swmm_out_file(out_file)
             if output_obj is None:
-                tk.messagebox.showwarning("Warning", f"Could not parse {out_file}")
-                continue
+                return None
 
             node_dataframes = {}
             for node_name in selected_nodes:
-                df = self.load_swmm_timeseries(out_file, node_name)
+                df = self.load_swmm_timeseries(out_file, node_name, window)
                 if df is not None:
-                    # (A) Convert numeric index -> Datetime (if needed)
-                    if not pd.api.types.is_datetime64_any_dtype(df.index):
-                        # Example assumption: index in hours
-                        fallback_start = datetime(2020, 1, 1)
-                        numeric_hours = df.index.astype(float)
-                        df.index = [fallback_start + pd.Timedelta(hours=h) for h in numeric_hours]
-
-                    # (B) Downsample if large
-                    if len(df) > 1_000_000:
-                        tk.messagebox.showinfo(
-                            "Performance Note",
-                            f"Data in {out_file} for node {node_name} is large. Downsampling..."
-                        )
-                        df = df.iloc[::10, :]
-                    node_dataframes[node_name] = df
+                    # (A) The index is already the file's shared DateTimeIndex
+
+                    # (B) Decimate to the plot width, keeping every peak and trough
+                    node_dataframes[node_name] = self.decimate_for_plot(df, width)
                 else:
                     node_dataframes[node_name] = None
+            return node_dataframes
+
+        loading_label = tk.Label(file_frame, text=f"Loading {len(selected_files)} files...", bg=BG_COLOR, fg=FG_COLOR)
+        loading_label.pack(pady=2)
+        loaded_count = [0]
+
+        def add_file(out_file, node_dataframes):
+            loaded_count[0] += 1
+            loading_label.config(text=f"Loaded {loaded_count[0]} of {len(selected_files)} files...")
+            if node_dataframes is None:
+                tk.messagebox.showwarning("Warning", f"Could not parse {out_file}")
+                return
 
             # (C) Determine earliest start among loaded nodes
             valid_dfs = [ndf for ndf in node_dataframes.values() if isinstance(ndf, pd.DataFrame)]
@@ -632,17 +1041,7 @@ class SWMMApp:
                 "shift_offset": pd.Timedelta(0),
             }
 
-            # Attempt to find an earliest timestamp among loaded nodes
-            valid_dfs = [ndf for ndf in node_dataframes.values() if isinstance(ndf, pd.DataFrame)]
-            if valid_dfs:
-                earliest_time = min(df.index[0] for df in valid_dfs)
-                self.overlay_data_storage[out_file]["start_datetime"] = earliest_time
-            else:
-                self.overlay_data_storage[out_file]["start_datetime"] = None
-
-        # Now create a row in file_frame for each file
-        row_index = 1
-        for out_file in self.overlay_data_storage.keys():
+            # Now create a row in file_frame for this file
             config_frame = tk.Frame(file_frame, bg=BG_COLOR)
             config_frame.pack(pady=5, fill='x')
 
@@ -690,7 +1089,7 @@ class SWMMApp:
                 "dt_var": dt_var
             }
 
-            row_index += 1
+        self.load_files_async(selected_files, load_overlay_file, add_file, loading_label.destroy, owner=popup)
 
         # 3. Node Navigation Controls (Previous / Next Node)
         navigation_frame = tk.Frame(popup, bg=BG_COLOR)
@@ -699,6 +1098,31 @@ class SWMMApp:
         self.current_node_index = 0  # we start at the first node
         self.selected_nodes_list = selected_nodes
 
+        # NumPy column data of each (file, node, shift), shared by the on-screen
+        # plot and the exports so the arrays are only built once
+        overlay_sources = {}
+
+        def overlay_lines(node):
+            """
+            (label, color, column data) of `node` for every loaded file, each shifted by its alignment offset.
+            """
+            lines = []
+            for file, config in self.overlay_data_storage.items():
+                df = config["node_dfs"].get(node)
+                if df is None or df.empty:
+                    continue
+
+                key = (file, node, config["shift_offset"])
+                if key not in overlay_sources:
+                    shifted_index = df.index + config["shift_offset"]
+                    logging.debug(f"File={file}, Node={node}, OrigStart={df.index[0]}, Shift={config['shift_offset']}, NewStart={shifted_index[0]}")
+                    overlay_sources[key] = series_columns(shifted_index, df[node].to_numpy())
+                lines.append((os.path.basename(file), config["color"], overlay_sources[key]))
+            return lines
+
+        def build_overlay_figure(node, width, height):
+            return overlay_figure(overlay_lines(node), f"Overlay for Node: {node}", width, height)
+
         def plot_current_node():
             """
             Plot overlay for the currently selected node index using Bokeh.
@@ -738,45 +1162,6 @@ class SWMMApp:
                     config["shift_offset"] = pd.Timedelta(0)
                     config["start_datetime"] = config["original_start_datetime"]
 
-            # Now build the Bokeh figure
-            bokeh_width = self.plot_width_var.get()
-            bokeh_height = self.plot_height_var.get()
-
-            bokeh_fig = figure(
-                x_axis_type="datetime",
-                width=bokeh_width,
-                height=bokeh_height,
-                background_fill_color="#FFFFFF",
-                title=f"Overlay for Node: {node}"
-            )
-
-            legend_items = []
-
-            # Plot each file
-            for file, config in self.overlay_data_storage.items():
-                node_dfs = config["node_dfs"]
-                offset = config["shift_offset"]
-                color = config["color"]
-                df = node_dfs.get(node)
-                if df is None or df.empty:
-                    continue
-
-                # Shift the index
-                shifted_index = df.index + offset
-                times = list(shifted_index)
-                flows = df[node].tolist()
-
-                r = bokeh_fig.line(x=times, y=flows, line_color=color, line_width=2, alpha=0.8)
-                legend_items.append((os.path.basename(file), [r]))
-
-                # (Optional) Debug print to confirm shift
-                print(f"File={file}, Node={node}, OrigStart={df.index[0]}, Shift={offset}, NewStart={shifted_index[0]}")
-
-            # Add legend
-            if legend_items:
-                legend = Legend(items=legend_items, location="top_left")
-                bokeh_fig.add_layout(legend, 'right')
-
             # If we already have a display, clear it
             if hasattr(self, "bokeh_display_frame"):
                 self.bokeh_display_frame.destroy()
@@ -784,7 +1169,17 @@ class SWMMApp:
             self.bokeh_display_frame = tk.Frame(popup, bg=BG_COLOR)
             self.bokeh_display_frame.pack(pady=10, fill='both', expand=True)
 
-            # Show in browser or local HTML
+            # Push only the new data to the page served by the local Bokeh server,
+            # which is opened in the browser the first time
+            width, height = self.plot_width_var.get(), self.plot_height_var.get()
+            try:
+                self.overlay_server.show(overlay_lines(node), f"Overlay for Node: {node}", width, height)
+                return
+            except Exception as e:
+                logging.warning(f"Overlay server unavailable, writing a static page instead: {e}")
+
+            # Fallback: standalone HTML page in the browser
+            bokeh_fig = build_overlay_figure(node, width, height)
             html_content = file_html(bokeh_fig, CDN, "Overlay")
             html_path = os.path.join(os.getcwd(), "temp_overlay.html")
             with open(html_path, 'w', encoding='utf-8') as f:
@@ -819,38 +1214,7 @@ class SWMMApp:
         def export_html():
             # Use Bokeh's file_html to generate HTML with the current node's figure
             node = self.selected_nodes_list[self.current_node_index]
-            bokeh_fig = figure(
-                x_axis_type="datetime",
-                title=f"Overlay for Node: {node}",
-                width=1200,
-                height=900
-            )
-            legend_items = []
-            for file, config in self.overlay_data_storage.items():
-                node_dfs = config["node_dfs"]
-                color = config["color"]
-                offset = config["shift_offset"]
-                if node not in node_dfs or node_dfs[node] is None:
-                    continue
-                df = node_dfs[node]
-                if df.empty:
-                    continue
-
-                shifted_index = df.index + offset
-                times = list(shifted_index)
-                flows = df[node].tolist()
-
-                r = bokeh_fig.line(
-                    x=times,
-                    y=flows,
-                    line_color=color,
-                    line_width=2,
-                    alpha=0.8
-                )
-                legend_items.append((os.path.basename(file), [r]))
-            if legend_items:
-                legend = Legend(items=legend_items, location="top_left")
-                bokeh_fig.add_layout(legend, 'right')
+            bokeh_fig = build_overlay_figure(node, 1200, 900)
 
             save_path = tk.filedialog.asksaveasfilename(defaultextension=".html",
                                                         filetypes=[("HTML files", "*.html")])
@@ -870,33 +1234,7 @@ class SWMMApp:
                 return
 
             node = self.selected_nodes_list[self.current_node_index]
-            bokeh_fig = figure(
-                x_axis_type="datetime",
-                title=f"Overlay for Node: {node}",
-                width=1200,
-                height=900
-            )
-            legend_items = []
-            for file, config in self.overlay_data_storage.items():
-                node_dfs = config["node_dfs"]
-                color = config["color"]
-                offset = config["shift_offset"]
-                if node not in node_dfs or node_dfs[node] is None:
-                    continue
-                df = node_dfs[node]
-                if df.empty:
-                    continue
-
-                shifted_index = df.index + offset
-                times = list(shifted_index)
-                flows = df[node].tolist()
-
-                r = bokeh_fig.line(x=times, y=flows, line_color=color, line_width=2, alpha=0.8)
-                legend_items.append((os.path.basename(file), [r]))
-
-            if legend_items:
-                legend = Legend(items=legend_items, location="top_left")
-                bokeh_fig.add_layout(legend, 'right')
+            bokeh_fig = build_overlay_figure(node, 1200, 900)
 
             save_path = tk.filedialog.asksaveasfilename(defaultextension=".png",
                                                         filetypes=[("PNG files", "*.png")])
@@ -910,11 +1248,14 @@ class SWMMApp:
             side=tk.LEFT, padx=5)
 
     def display_graph(self, inflow_data, node_name, file_name):
+        import matplotlib.pyplot as plt
+        from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+
         graph_window = tk.Toplevel(self.root)
         graph_window.title(f"Visualization - {node_name}")
 
         fig, ax = plt.subplots(figsize=(10, 6))
-        ax.plot(inflow_data, label=f"{node_name} ({file_name})")
+        ax.plot(self.decimate_for_plot(inflow_data), label=f"{node_name} ({file_name})")
         ax.set_title(f"Inflow Data for Node {node_name}")
         ax.set_xlabel("Time")
         ax.set_ylabel("Flow")
@@ -926,6 +1267,8 @@ class SWMMApp:
 
     # Matplotlib Toolbar Integration
     def add_toolbar(fig, graph_window):
+        from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg, NavigationToolbar2Tk
+
         toolbar_frame = tk.Frame(graph_window)
         toolbar_frame.pack()
         canvas = FigureCanvasTkAgg(fig, master=graph_window)
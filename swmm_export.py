@@ -0,0 +1,236 @@
+import logging
+from abc import ABC, abstractmethod
+import numpy as np
+import pandas as pd
+from swmm_profiling import NULL_PROFILE
+
+RESULT_COLUMNS = ["Name", ".OUT file name", "Element type", "Variable", "Objective", "Outcome", "Status", "Message"]
+
+# Status codes of the result table; Outcome is NaN unless the status is "OK"
+STATUS_CODES = ["OK", "Not Available", "Data Not Found", "Error"]
+STATUS_OK, STATUS_NOT_AVAILABLE, STATUS_DATA_NOT_FOUND, STATUS_ERROR = range(len(STATUS_CODES))
+# Categories are kept as plain objects so tables of different files concatenate cleanly
+STATUS_CATEGORIES = pd.Index(STATUS_CODES, dtype=object)
+
+# Rows per Excel worksheet, including the header row
+EXCEL_MAX_ROWS = 1_048_576
+
+
+def _categorical(labels, codes):
+    """
+    Categorical column from a list of (possibly repeated) labels and per-row codes into it.
+    """
+    label_codes, uniques = pd.factorize(pd.Index(labels, dtype=object))
+    return pd.Categorical.from_codes(label_codes[codes], categories=uniques)
+
+
+def _constant(value, n_rows):
+    """
+    Categorical column holding the same value (or NaN for None) in every row.
+    """
+    if value is None:
+        return pd.Categorical.from_codes(np.full(n_rows, -1, dtype=np.int8), categories=pd.Index([], dtype=object))
+    return pd.Categorical.from_codes(np.zeros(n_rows, dtype=np.int8), categories=pd.Index([value], dtype=object))
+
+
+def result_table(names, out_file_name, objectives, outcome, status, kind=None, variable=None):
+    """
+    Builds the typed long-format result table of one .OUT file and one (element type,
+    variable) pair from (names x objectives) arrays of outcome values and status codes,
+    one row per (name, objective) in name order. All columns are categorical except
+    Outcome, which is float64.
+    """
+    n_names, n_objectives = len(names), len(objectives)
+    n_rows = n_names * n_objectives
+    return pd.DataFrame({
+        "Name": _categorical(names, np.repeat(np.arange(n_names), n_objectives)),
+        ".OUT file name": _constant(out_file_name, n_rows),
+        "Element type": _constant(kind, n_rows),
+        "Variable": _constant(variable, n_rows),
+        "Objective": _categorical(objectives, np.tile(np.arange(n_objectives), n_names)),
+        "Outcome": np.asarray(outcome, dtype=np.float64).ravel(),
+        "Status": pd.Categorical.from_codes(np.asarray(status, dtype=np.int8).ravel(), categories=STATUS_CATEGORIES),
+        "Message": _constant(None, n_rows),
+    })
+
+
+def error_table(out_file_name, message, kind=None, variable=None):
+    """
+    Single-row result table recording that a whole .OUT file, or one (element type,
+    variable) pair of it, could not be processed.
+    """
+    return pd.DataFrame({
+        "Name": _constant(None, 1),
+        ".OUT file name": _constant(out_file_name, 1),
+        "Element type": _constant(kind, 1),
+        "Variable": _constant(variable, 1),
+        "Objective": _constant(None, 1),
+        "Outcome": np.array([np.nan]),
+        "Status": pd.Categorical.from_codes([STATUS_ERROR], categories=STATUS_CATEGORIES),
+        "Message": _constant(message, 1),
+    })
+
+
+def concat_tables(tables):
+    """
+    Concatenates result tables, merging the categories of each column so the
+    result stays categorical.
+    """
+    if len(tables) == 1:
+        return tables[0]
+    if not tables:
+        return result_table([], None, [], np.empty((0, 0)), np.empty((0, 0)))
+    return pd.DataFrame({
+        column: pd.api.types.union_categoricals([table[column] for table in tables], ignore_order=True)
+        if column != "Outcome" else np.concatenate([table[column].to_numpy() for table in tables])
+        for column in RESULT_COLUMNS
+    })
+
+
+def _text_categories(column):
+    """
+    Same categorical column with every category converted to text.
+    """
+    codes, uniques = pd.factorize(pd.Index([str(category) for category in column.cat.categories], dtype=object))
+    column_codes = column.cat.codes.to_numpy()
+    text_codes = np.full(len(column_codes), -1, dtype=np.int64)
+    valid = column_codes >= 0
+    text_codes[valid] = codes[column_codes[valid]]
+    return pd.Categorical.from_codes(text_codes, categories=uniques)
+
+
+class ResultWriter(ABC):
+    """
+    Writes the typed long-format result rows incrementally, one .OUT file's table at a time,
+    so memory stays bounded by the largest single file instead of the whole batch.
+    """
+
+    def __init__(self, save_path):
+        self.save_path = save_path
+        self.rows_written = 0
+
+    @abstractmethod
+    def write(self, results_df):
+        """
+        Appends one file's result table to the export.
+        """
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+class CsvResultWriter(ResultWriter):
+    """
+    Appends rows to one CSV file (also used for TXT); the header is written once.
+    """
+
+    def __init__(self, save_path):
+        super().__init__(save_path)
+        self.file = open(save_path, 'w', newline='', encoding='utf-8')
+        pd.DataFrame(columns=RESULT_COLUMNS).to_csv(self.file, index=False)
+
+    def write(self, results_df):
+        results_df.to_csv(self.file, header=False, index=False)
+        self.rows_written += len(results_df)
+
+    def close(self):
+        self.file.close()
+
+
+class ExcelResultWriter(ResultWriter):
+    """
+    Streams rows into an openpyxl write-only workbook, which keeps constant memory.
+    Continues on a new worksheet when one is full.
+    """
+
+    def __init__(self, save_path):
+        super().__init__(save_path)
+        from openpyxl import Workbook
+        self.workbook = Workbook(write_only=True)
+        self.sheet = None
+        self.sheet_rows = 0
+        self._new_sheet()
+
+    def _new_sheet(self):
+        n_sheets = len(self.workbook.worksheets)
+        self.sheet = self.workbook.create_sheet("Sheet1" if not n_sheets else f"Sheet{n_sheets + 1}")
+        self.sheet.append(RESULT_COLUMNS)
+        self.sheet_rows = 1
+
+    def write(self, results_df):
+        # Excel has no NaN, leave those cells empty
+        results_df = results_df.astype(object).where(results_df.notna(), None)
+        for row in results_df.itertuples(index=False, name=None):
+            if self.sheet_rows >= EXCEL_MAX_ROWS:
+                self._new_sheet()
+            self.sheet.append(row)
+            self.sheet_rows += 1
+        self.rows_written += len(results_df)
+
+    def close(self):
+        self.workbook.save(self.save_path)
+
+
+class ParquetResultWriter(ResultWriter):
+    """
+    Appends one row group per .OUT file to a Parquet file (requires pyarrow).
+    Categorical columns are stored dictionary-encoded.
+    """
+
+    def __init__(self, save_path):
+        super().__init__(save_path)
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            raise ImportError("Parquet export needs the pyarrow package (pip install pyarrow).")
+        self.pa = pyarrow
+        text = pyarrow.dictionary(pyarrow.int32(), pyarrow.string())
+        self.schema = pyarrow.schema([(column, pyarrow.float64() if column == "Outcome" else text)
+                                      for column in RESULT_COLUMNS])
+        self.writer = pyarrow.parquet.ParquetWriter(save_path, self.schema)
+
+    def write(self, results_df):
+        # Names read from Excel may be numbers; Parquet dictionaries hold text
+        results_df = results_df.assign(Name=_text_categories(results_df["Name"]))
+        table = self.pa.Table.from_pandas(results_df, schema=self.schema, preserve_index=False)
+        self.writer.write_table(table)
+        self.rows_written += len(results_df)
+
+    def close(self):
+        self.writer.close()
+
+
+def open_result_writer(save_path, output_format):
+    """
+    Returns the streaming ResultWriter for the given export format.
+    """
+    if output_format == "Excel":
+        return ExcelResultWriter(save_path)
+    elif output_format == "CSV" or output_format == "TXT":
+        return CsvResultWriter(save_path)
+    elif output_format == "Parquet":
+        return ParquetResultWriter(save_path)
+    raise ValueError(f"Unknown export format '{output_format}'")
+
+
+def write_results(file_tables, save_path, output_format, profile=None):
+    """
+    Writes each per-file result table as soon as it arrives, timing the writes in the
+    "write" stage of `profile` (an optional swmm_profiling.RunProfile).
+    Returns the number of rows written.
+    """
+    profile = profile or NULL_PROFILE
+    with open_result_writer(save_path, output_format) as writer:
+        for file_table in file_tables:
+            with profile.stage("write"):
+                writer.write(file_table)
+            profile.count("rows_written", len(file_table))
+    logging.info(f"Wrote {writer.rows_written} result rows to {save_path}")
+    return writer.rows_written
@@ -0,0 +1,691 @@
+import os
+import sys
+import glob
+import argparse
+import time
+import queue
+import logging
+import threading
+import multiprocessing
+from collections import deque, namedtuple
+from concurrent.futures import Future, ProcessPoolExecutor
+from functools import partial
+import numpy as np
+import pandas as pd
+from swmm_io import open_results_map, file_key, content_hash, SeriesSidecarCache, ReadCancelled, CHUNK_PERIODS
+from swmm_stats import peak_statistics, event_statistics, PeakAccumulator, EventAccumulator, EventDefinition
+from swmm_profiling import RunProfile, NULL_PROFILE
+from swmm_manifest import ExtractionManifest
+from swmm_options import (METRIC_OPTIONS, EXPORT_EXTENSIONS, DEFAULT_VARIABLES, EVENT_THRESHOLD,
+                          MIN_INTER_EVENT_HOURS, default_workers)
+from swmm_export import (STATUS_OK, STATUS_NOT_AVAILABLE, STATUS_DATA_NOT_FOUND, result_table, error_table,
+                         concat_tables, write_results)
+
+# Nothing in this module may import tkinter, matplotlib or bokeh: it is imported
+# by every process-pool worker and by the headless command line, and must stay
+# cheap to load on machines without a display.
+
+# Workers are spawned, never forked: the GUI starts the pool from a background
+# thread while the Tk loop, the loader threads and the Bokeh server run, and a
+# forked worker would inherit any lock one of them holds at that moment.
+WORKER_START_METHOD = "spawn"
+
+
+def check_ranks(nth_max_value=None, nth_min_value=None):
+    """
+    Raises ValueError unless the enabled nth max / nth min ranks are at least 1.
+    """
+    for label, value in (("nth maximum", nth_max_value), ("nth minimum", nth_min_value)):
+        if value is not None and value < 1:
+            raise ValueError(f"The {label} rank must be 1 or more, got {value}")
+
+
+def metric_objectives(stats, n_periods, selected_metrics, nth_max_value=None, nth_min_value=None):
+    """
+    Turns the output of peak_statistics into one (objective, values, available) triple
+    per requested metric, each array running over the columns of the statistics.
+    With the output of event_statistics every peak is followed by the volume and
+    the duration (in hours) of its event.
+    """
+    check_ranks(nth_max_value, nth_min_value)
+    n_columns = stats["minimum"].shape[0]
+    objectives = []
+
+    def add_peak(name, index):
+        available = index < stats["peak_counts"]
+        objectives.append((name, stats["peaks"][index], available))
+        if "volumes" in stats:
+            objectives.append((f"{name} Volume", stats["volumes"][index], available))
+            objectives.append((f"{name} Duration (h)", stats["durations"][index] / 3600, available))
+
+    for metric in selected_metrics:
+        if "Max" in metric:
+            add_peak(metric, int(metric.split(" ")[0][0]) - 1)
+        elif metric == "Minimum":
+            objectives.append((metric, stats["minimum"], np.full(n_columns, n_periods > 0)))
+
+    # Nth value processing
+    if nth_max_value is not None:
+        add_peak(f"{nth_max_value}th Max", nth_max_value - 1)
+    if nth_min_value is not None:
+        objectives.append((f"{nth_min_value}th Min", stats["minima"][nth_min_value - 1],
+                           np.full(n_columns, nth_min_value <= n_periods)))
+    return objectives
+
+
+def max_rank(selected_metrics, nth_max_value=None):
+    """
+    Highest peak rank needed by the selected metrics (0 if no peaks are needed).
+    """
+    max_ranks = [int(metric.split(" ")[0][0]) for metric in selected_metrics if "Max" in metric]
+    if nth_max_value is not None:
+        max_ranks.append(nth_max_value)
+    return max(max_ranks, default=0)
+
+
+def objective_names(selected_metrics, nth_max_value=None, nth_min_value=None, events=None):
+    """
+    Objective names in the order of metric_objectives; with `events` every peak is
+    followed by its event volume and duration.
+    """
+    peak_names = [metric for metric in selected_metrics if "Max" in metric or metric == "Minimum"]
+    if nth_max_value is not None:
+        peak_names.append(f"{nth_max_value}th Max")
+    names = []
+    for name in peak_names:
+        names.append(name)
+        if events is not None and name != "Minimum":
+            names += [f"{name} Volume", f"{name} Duration (h)"]
+    if nth_min_value is not None:
+        names.append(f"{nth_min_value}th Min")
+    return names
+
+
+def request_statistics(results_map, requests, n_max=0, n_min=0, periods=None, stream_periods=None, profile=None,
+                       events=None, cancel=None):
+    """
+    peak_statistics of every (element type, labels, variable) request of one file,
+    or event_statistics with an EventDefinition as `events`.
+    `periods` is an optional list of period slices (time windows, see
+    SwmmResultsMap.periods_between); the statistics cover all of them, each window
+    being a separate series. With `stream_periods`, or with several windows, the
+    series are streamed through PeakAccumulators `stream_periods` report periods
+    at a time instead of being copied out whole, so memory stays bounded however
+    long the simulation is. `cancel` is an optional event checked between chunks of
+    period records (ReadCancelled is raised once it is set).
+    Returns (found_labels, stats, n_periods) per request.
+    """
+    profile = profile or NULL_PROFILE
+    step_seconds = results_map.output.report_interval.total_seconds()
+    if stream_periods is None and (periods is None or len(periods) == 1):
+        with profile.stage("read"):
+            blocks = results_map.blocks(requests, periods=periods[0] if periods else None, cancel=cancel)
+        results = []
+        for found_labels, block in blocks:
+            with profile.stage("peaks"):
+                if events is None:
+                    stats = peak_statistics(block, n_max=n_max, n_min=n_min)
+                else:
+                    stats = event_statistics(block, events, step_seconds, n_max=n_max, n_min=n_min)
+                results.append((found_labels, stats, block.shape[0]))
+        return results
+
+    if events is None:
+        accumulator_type = partial(PeakAccumulator, n_max=n_max, n_min=n_min)
+    else:
+        accumulator_type = partial(EventAccumulator, events=events, step_seconds=step_seconds, n_max=n_max,
+                                   n_min=n_min)
+    found, accumulators = None, None
+    for window in periods or [None]:
+        found, chunks = results_map.stream_blocks(requests, window, stream_periods or CHUNK_PERIODS, cancel)
+        if accumulators is None:
+            accumulators = [accumulator_type(len(found_labels)) for found_labels in found]
+        while True:
+            with profile.stage("read"):
+                parts = next(chunks, None)
+            if parts is None:
+                break
+            with profile.stage("peaks"):
+                for accumulator, part in zip(accumulators, parts):
+                    accumulator.update(part)
+        for accumulator in accumulators:
+            accumulator.end_segment()
+    return [(found_labels, accumulator.result(), accumulator.n_periods)
+            for found_labels, accumulator in zip(found, accumulators)]
+
+
+def extract_file(out_file, names, selected_metrics, nth_max_value=None, nth_min_value=None, cache=None,
+                 sidecar=None, variables=DEFAULT_VARIABLES, profile=None, windows=None, stream_periods=None,
+                 events=None, cancel=None):
+    """
+    Computes the selected peak/minimum metrics for every requested (element type,
+    variable) pair and every name in one .OUT file. Each name is looked up among
+    the elements of each requested type; all series are copied out of the file
+    in a single scan. nth_max_value / nth_min_value are None when disabled.
+    `cache` is an optional ResultsMapCache to open the file through, `sidecar`
+    an optional SeriesSidecarCache used when the file is opened directly.
+    Stage times and counters are recorded in `profile` (an optional RunProfile).
+    `windows` is an optional list of (start, end) times (either may be None) that
+    limits the statistics to those periods; `stream_periods` streams the series in
+    chunks of that many periods (see request_statistics). With an EventDefinition as
+    `events`, the "Max" metrics are the peaks of independent events, each followed by
+    the event's volume and duration (see swmm_stats.event_statistics).
+    Once the optional `cancel` event is set (in a worker process, the event handed to
+    the pool by extract_files), the read stops at the next chunk of period records
+    and ReadCancelled is raised.
+    Returns the typed long-format result table of the file (see swmm_export.result_table).
+    """
+    out_file_name = out_file.split('/')[-1]
+    profile = profile or NULL_PROFILE
+    if cancel is None:
+        cancel = _worker_cancel
+
+    with profile.stage("parse"):
+        results_map = cache.get(out_file) if cache is not None else open_results_map(out_file, sidecar=sidecar)
+    if results_map is None:
+        # Skip this .OUT file or record an error
+        return error_table(out_file, "Could not parse this file")
+    profile.count("files_parsed")
+
+    tables = []
+    requests = []
+    for kind, variable in variables:
+        if kind not in results_map.labels or variable not in results_map.variables.get(kind, []):
+            tables.append(error_table(out_file_name, f"Variable '{variable}' is not available for element type "
+                                                     f"'{kind}'", kind, variable))
+        else:
+            requests.append((kind, variable))
+
+    # Copy every requested series out of the memory map in one pass over the period records
+    bytes_before = results_map.bytes_read
+    try:
+        periods = [results_map.periods_between(start, end) for start, end in windows] if windows else None
+        statistics = request_statistics(results_map, [(kind, names, variable) for kind, variable in requests],
+                                        n_max=max_rank(selected_metrics, nth_max_value), n_min=nth_min_value or 0,
+                                        periods=periods, stream_periods=stream_periods, profile=profile,
+                                        events=events, cancel=cancel)
+    except ReadCancelled:
+        raise
+    except Exception as e:
+        logging.error(f"Error reading results from {out_file}: {e}")
+        return error_table(out_file_name, str(e))
+    finally:
+        profile.count("bytes_read", results_map.bytes_read - bytes_before)
+        if cache is None:
+            results_map.close()
+
+    objectives = objective_names(selected_metrics, nth_max_value, nth_min_value, events)
+    # A name counts as found when it is an element of any requested type, even if the
+    # variable requested for that type is unavailable (that gets its own Error row)
+    found_anywhere = np.zeros(len(names), dtype=bool)
+    for kind in dict.fromkeys(kind for kind, _ in variables):
+        if kind in results_map.labels:
+            found_anywhere |= results_map.output.contains(kind, names)
+
+    for (kind, variable), (found_names, stats, n_periods) in zip(requests, statistics):
+        profile.count("series_read", len(found_names))
+        profile.count("peaks_found", stats["peak_counts"].sum())
+
+        with profile.stage("table"):
+            columns = metric_objectives(stats, n_periods, selected_metrics, nth_max_value, nth_min_value)
+            if columns:
+                found_values = np.column_stack([values for _, values, _ in columns])
+                found_available = np.column_stack([available for _, _, available in columns])
+            else:
+                found_values = found_available = np.zeros((len(found_names), 0))
+            outcome = np.where(found_available, found_values, np.nan)
+            status = np.where(found_available, STATUS_OK, STATUS_NOT_AVAILABLE)
+            tables.append(result_table(found_names, out_file_name, objectives, outcome, status, kind, variable))
+
+    with profile.stage("table"):
+        # Names that are not an element of any requested type
+        missing_names = [name for name, found in zip(names, found_anywhere) if not found]
+        if missing_names:
+            status = np.full((len(missing_names), len(objectives)), STATUS_DATA_NOT_FOUND)
+            tables.append(result_table(missing_names, out_file_name, objectives, np.full(status.shape, np.nan),
+                                       status))
+        return concat_tables(tables)
+
+
+# Cancel event of the extraction a worker process belongs to, set by _init_worker
+_worker_cancel = None
+
+
+def _init_worker(cancel):
+    """
+    Process pool initializer of extract_files. A multiprocessing event can only reach
+    a worker when the process is started, not through the arguments of a task.
+    """
+    global _worker_cancel
+    _worker_cancel = cancel
+
+
+def _extract_file_task(out_file, profiled=False, keyed=False, **kwargs):
+    """
+    extract_file as run by extract_files when a profile or a manifest is used.
+    Returns (table, profile.as_dict() or None, identity or None) so the timings and
+    the file identity (size, mtime_ns, content hash) of a worker process reach the
+    caller. The identity is taken before the file is read, so a file rewritten
+    during the extraction is never recorded against the old results.
+    """
+    profile = RunProfile() if profiled else None
+    identity = None
+    if keyed:
+        try:
+            with (profile or NULL_PROFILE).stage("hash"):
+                _, mtime_ns, size = file_key(out_file)
+                identity = (size, mtime_ns, content_hash(out_file))
+        except OSError as e:
+            logging.warning(f"Could not identify {out_file}, its results will not be stored: {e}")
+    table = extract_file(out_file, profile=profile, **kwargs)
+    return table, profile.as_dict() if profiled else None, identity
+
+
+def extract_files(out_files, names, selected_metrics, nth_max_value=None, nth_min_value=None, workers=None,
+                  cache=None, sidecar=None, variables=DEFAULT_VARIABLES, profile=None, manifest=None, windows=None,
+                  stream_periods=None, events=None, cancel=None):
+    """
+    Runs extract_file for every .OUT file, spreading the files over a process pool
+    of `workers` processes (defaults to the CPU count, 1 runs in-process).
+    `cache` (a ResultsMapCache) is only used in-process; workers open their own files
+    and read through `sidecar` (a SeriesSidecarCache) when given.
+    With a `profile` (a RunProfile), the stage times and counters of every file,
+    wherever it was processed, are merged into it.
+    With a `manifest` (an ExtractionManifest built for the same settings), files that
+    are unchanged since the last run are served from it and only new or changed files
+    are extracted; their tables are stored in it as they arrive.
+    `windows`, `stream_periods` and `events` are passed on to extract_file.
+    `cancel` is an optional event (a multiprocessing event when `workers` > 1) that
+    stops the files in progress at their next chunk of period records; the file
+    being read then raises ReadCancelled. Closing the generator early cancels the
+    files not yet started; without `cancel`, running workers finish their file.
+    Yields the typed per-file result tables in the order of `out_files`.
+    """
+    out_files = list(out_files)
+    extract_args = dict(names=list(names), selected_metrics=list(selected_metrics), nth_max_value=nth_max_value,
+                        nth_min_value=nth_min_value, sidecar=sidecar, variables=list(variables),
+                        windows=list(windows) if windows else None, stream_periods=stream_periods, events=events)
+    if profile is None and manifest is None:
+        job = partial(extract_file, **extract_args)
+    else:
+        job = partial(_extract_file_task, profiled=profile is not None, keyed=manifest is not None, **extract_args)
+    tracker = profile or NULL_PROFILE
+
+    def lookup(out_file):
+        if manifest is None:
+            return None
+        with tracker.stage("manifest"):
+            table = manifest.lookup(out_file)
+        if table is not None:
+            tracker.count("files_reused")
+        return table
+
+    def collect(out_file, result):
+        if profile is None and manifest is None:
+            return result
+        file_table, file_profile, identity = result
+        if file_profile is not None:
+            profile.merge(file_profile)
+        if identity is not None:
+            manifest.store(out_file, file_table, identity)
+        return file_table
+
+    workers = min(workers or default_workers(), len(out_files))
+    if workers <= 1:
+        for out_file in out_files:
+            reused = lookup(out_file)
+            yield reused if reused is not None else collect(out_file, job(out_file, cache=cache, cancel=cancel))
+        return
+
+    def finish(out_file, item):
+        return collect(out_file, item.result()) if isinstance(item, Future) else item
+
+    logging.info(f"Extracting {len(out_files)} files with {workers} worker processes")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context(WORKER_START_METHOD),
+                             initializer=_init_worker, initargs=(cancel,)) as executor:
+        # Keep at most two files per worker in flight so finished tables never pile up
+        # while the consumer is still writing, and hand them back in submission order.
+        # Reused tables keep their place in the queue so the order is preserved.
+        pending = deque()
+        try:
+            for out_file in out_files:
+                reused = lookup(out_file)
+                pending.append((out_file, reused if reused is not None else executor.submit(job, out_file)))
+                if len(pending) >= 2 * workers:
+                    yield finish(*pending.popleft())
+            while pending:
+                yield finish(*pending.popleft())
+        finally:
+            # Closing the generator early (e.g. a cancelled job) drops the files not yet
+            # started; files already running stop at their next chunk once `cancel` is set
+            executor.shutdown(cancel_futures=True)
+
+
+class JobProgress(namedtuple("JobProgress", ["files_done", "n_files", "nodes_done", "n_nodes", "elapsed"])):
+    """
+    Snapshot of an ExtractionJob: files and (file, name) pairs processed so far,
+    and the seconds since the job started.
+    """
+
+    @property
+    def rate(self):
+        """
+        Names processed per second.
+        """
+        return self.nodes_done / self.elapsed if self.elapsed > 0 else 0.0
+
+    @property
+    def eta(self):
+        """
+        Estimated seconds until the job finishes, None before the first file is done.
+        """
+        if not self.nodes_done:
+            return None
+        return (self.n_nodes - self.nodes_done) / self.rate
+
+
+class JobCancelled(ReadCancelled):
+    pass
+
+
+class ExtractionJob:
+    """
+    Runs a full extraction (read names, extract_files, write_results) on a background
+    thread. The thread never touches the GUI: it reports through `events`, a
+    thread-safe queue of (kind, value) tuples that the caller polls:
+        ("progress", JobProgress)   after the names are read and after every .OUT file
+        ("profile", report_path)    with a `profile`, once the timing report is written
+        ("done", rows_written)
+        ("cancelled", None)         the partial output file has been removed
+        ("error", message)
+    cancel() stops the files in progress at their next chunk of period records (in worker
+    processes too); files not yet started are skipped.
+    With `incremental`, files unchanged since the last extraction to the same export
+    are taken from its manifest (see swmm_manifest) instead of being extracted again.
+    """
+
+    def __init__(self, out_files, excel_file_path, save_path, output_format, selected_metrics,
+                 nth_max_value=None, nth_min_value=None, workers=None, cache=None, sidecar=None,
+                 variables=DEFAULT_VARIABLES, profile=None, incremental=False, windows=None, stream_periods=None,
+                 events=None):
+        self.out_files = list(out_files)
+        self.excel_file_path = excel_file_path
+        self.save_path = save_path
+        self.output_format = output_format
+        self.extract_args = dict(selected_metrics=list(selected_metrics), nth_max_value=nth_max_value,
+                                 nth_min_value=nth_min_value, workers=workers, cache=cache, sidecar=sidecar,
+                                 variables=list(variables), windows=windows, stream_periods=stream_periods,
+                                 events=events)
+        # Optional RunProfile; its report is written next to the export
+        self.profile = profile
+        self.incremental = incremental
+        self.events = queue.Queue()
+        # Shared with the worker processes of extract_files
+        self._cancel = multiprocessing.get_context(WORKER_START_METHOD).Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self.run, name="extraction", daemon=True)
+        self._thread.start()
+
+    def cancel(self):
+        self._cancel.set()
+
+    @property
+    def cancelled(self):
+        return self._cancel.is_set()
+
+    def is_alive(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def run(self):
+        start = time.perf_counter()
+        if self.profile is not None:
+            self.profile.start()
+        try:
+            # Fails before the export file is created
+            check_ranks(self.extract_args["nth_max_value"], self.extract_args["nth_min_value"])
+            with (self.profile or NULL_PROFILE).stage("names"):
+                node_names = read_node_names(self.excel_file_path)
+            n_files, n_names = len(self.out_files), len(node_names)
+            self.events.put(("progress", JobProgress(0, n_files, 0, n_files * n_names, time.perf_counter() - start)))
+
+            def tracked(file_tables):
+                try:
+                    for files_done, file_table in enumerate(file_tables, start=1):
+                        if self._cancel.is_set():
+                            raise JobCancelled()
+                        yield file_table
+                        self.events.put(("progress", JobProgress(files_done, n_files, files_done * n_names,
+                                                                 n_files * n_names, time.perf_counter() - start)))
+                finally:
+                    file_tables.close()
+
+            if self._cancel.is_set():
+                raise JobCancelled()
+            manifest = None
+            if self.incremental:
+                manifest = open_manifest(self.save_path, node_names, **self.extract_args)
+            rows = write_results(tracked(extract_files(self.out_files, node_names, profile=self.profile,
+                                                       manifest=manifest, cancel=self._cancel,
+                                                       **self.extract_args)),
+                                 self.save_path, self.output_format, profile=self.profile)
+        except ReadCancelled:
+            # JobCancelled, or the file being read stopped by the cancel event
+            if os.path.exists(self.save_path):
+                os.remove(self.save_path)
+            logging.info("Extraction cancelled")
+            self.events.put(("cancelled", None))
+        except Exception as e:
+            logging.error(f"An error occurred during extraction: {e}")
+            self.events.put(("error", str(e)))
+        else:
+            if self.profile is not None:
+                self.profile.stop()
+                try:
+                    self.events.put(("profile", self.profile.write(self.save_path)))
+                except OSError as e:
+                    logging.warning(f"Could not write the timing report: {e}")
+            self.events.put(("done", rows))
+        finally:
+            if self.profile is not None:
+                # Also ends the cProfile / tracemalloc captures of a failed or cancelled run
+                self.profile.stop()
+
+
+def open_manifest(save_path, names, selected_metrics, nth_max_value=None, nth_min_value=None,
+                  variables=DEFAULT_VARIABLES, windows=None, events=None, **kwargs):
+    """
+    The ExtractionManifest of the export at `save_path` for these extraction settings.
+    Other keyword arguments of extract_files (workers, caches, streaming) do not
+    change the results and are ignored.
+    """
+    return ExtractionManifest.for_export(save_path, names, selected_metrics, nth_max_value, nth_min_value,
+                                         variables, windows, events)
+
+
+def read_node_names(excel_file_path):
+    """
+    Reads the element names from the `Name` column of the Excel sheet.
+    """
+    df = pd.read_excel(excel_file_path)
+    return df['Name'].tolist()
+
+
+def expand_out_files(patterns):
+    """
+    Expands .OUT file globs in the given order, dropping duplicates.
+    """
+    out_files = []
+    for pattern in patterns:
+        matches = sorted(glob.glob(pattern)) if glob.has_magic(pattern) else [pattern]
+        if not matches:
+            logging.warning(f"No .OUT files match {pattern}")
+        for match in matches:
+            if match not in out_files:
+                out_files.append(match)
+    return out_files
+
+
+def parse_variable(text):
+    """
+    Parses an "element type:variable" command-line value, e.g. "link:flow".
+    """
+    kind, _, variable = text.partition(":")
+    if not kind or not variable:
+        raise argparse.ArgumentTypeError(f"expected ELEMENT_TYPE:VARIABLE, got '{text}'")
+    return kind, variable
+
+
+def positive_int(text):
+    """
+    Parses a command-line rank, which must be 1 or more.
+    """
+    try:
+        value = int(text)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected a whole number, got '{text}'")
+    if value < 1:
+        raise argparse.ArgumentTypeError(f"must be 1 or more, got {value}")
+    return value
+
+
+def parse_time(text):
+    """
+    Parses a command-line date and time, e.g. "2023-05-01" or "2023-05-01 06:30".
+    """
+    try:
+        return pd.Timestamp(text)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected a date and time, got '{text}'")
+
+
+def read_windows(file_path):
+    """
+    Reads event windows from the `Start` and `End` columns of a CSV or Excel file.
+    Returns a list of (start, end) Timestamps.
+    """
+    if os.path.splitext(file_path)[1].lower() == ".csv":
+        df = pd.read_csv(file_path)
+    else:
+        df = pd.read_excel(file_path)
+    return list(zip(pd.to_datetime(df['Start']), pd.to_datetime(df['End'])))
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Extract peak/minimum statistics from SWMM .OUT files without the GUI.")
+    parser.add_argument("out_files", nargs="+", metavar="OUT",
+                        help=".OUT files or glob patterns (quote globs on Linux, e.g. 'runs/*.out')")
+    parser.add_argument("-n", "--names", required=True,
+                        help="Excel file with the element names in a 'Name' column")
+    parser.add_argument("-m", "--metric", action="append", default=[], choices=METRIC_OPTIONS,
+                        help="metric to extract, repeat for several (e.g. -m '1st Max' -m Minimum)")
+    parser.add_argument("-v", "--variable", action="append", type=parse_variable, metavar="TYPE:VARIABLE",
+                        help="element type and variable to extract, repeat for several "
+                             "(default: node:total_inflow; e.g. -v link:flow -v subcatchment:runoff)")
+    parser.add_argument("--nth-max", type=positive_int, metavar="N", help="also extract the Nth largest peak")
+    parser.add_argument("--nth-min", type=positive_int, metavar="N", help="also extract the Nth smallest value")
+    parser.add_argument("-f", "--format", choices=list(EXPORT_EXTENSIONS),
+                        help="export format (default: inferred from the output extension, else Excel)")
+    parser.add_argument("-o", "--output", required=True, help="path of the exported results")
+    parser.add_argument("-w", "--workers", type=int, default=default_workers(),
+                        help="number of worker processes (default: CPU count)")
+    parser.add_argument("--series-cache", nargs="?", const="", metavar="DIR",
+                        help="cache decoded series on disk, next to the .OUT files or in DIR")
+    parser.add_argument("--start", type=parse_time, metavar="TIME",
+                        help="only use report periods from this time on (e.g. '2023-05-01 06:00')")
+    parser.add_argument("--end", type=parse_time, metavar="TIME", help="only use report periods up to this time")
+    parser.add_argument("--windows", metavar="FILE",
+                        help="CSV or Excel file with Start and End columns; statistics cover only these event "
+                             "windows, each treated as a separate series (replaces --start/--end)")
+    parser.add_argument("--stream-periods", type=int, metavar="N",
+                        help="stream each file N report periods at a time with bounded memory, for very long "
+                             "simulations (e.g. 100000)")
+    parser.add_argument("--events", action="store_true",
+                        help="rank independent events instead of local peaks: the Max metrics become event peaks, "
+                             "each followed by the event volume and duration")
+    parser.add_argument("--event-threshold", type=float, default=EVENT_THRESHOLD, metavar="VALUE",
+                        help=f"values above this belong to an event (default: {EVENT_THRESHOLD})")
+    parser.add_argument("--min-inter-event", type=float, default=MIN_INTER_EVENT_HOURS, metavar="HOURS",
+                        help="shortest gap at or below the threshold that separates two events "
+                             f"(default: {MIN_INTER_EVENT_HOURS})")
+    parser.add_argument("--incremental", action="store_true",
+                        help="only extract .OUT files that are new or changed since the last run to the same "
+                             "output (results are kept in <output>.manifest)")
+    parser.add_argument("--profile", action="store_true",
+                        help="write a per-stage timing report (<output>.profile.json/.txt) and print it")
+    parser.add_argument("--cprofile", action="store_true",
+                        help="add a cProfile capture of the main process to the timing report (implies --profile)")
+    parser.add_argument("--tracemalloc", action="store_true",
+                        help="add the peak traced memory of the main process to the timing report "
+                             "(implies --profile)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """
+    Headless batch entry point; runs the same extraction as the GUI's Extract Data button.
+    Returns the process exit code.
+    """
+    args = parse_args(argv)
+
+    if not args.metric and args.nth_max is None and args.nth_min is None:
+        logging.error("Please select at least one metric or an nth max/min option.")
+        return 2
+
+    output_format = args.format
+    if output_format is None:
+        extension = os.path.splitext(args.output)[1].lower()
+        output_format = {ext: fmt for fmt, ext in EXPORT_EXTENSIONS.items()}.get(extension, "Excel")
+
+    out_files = expand_out_files(args.out_files)
+    if not out_files:
+        logging.error("No .OUT files to process.")
+        return 2
+
+    sidecar = None
+    if args.series_cache is not None:
+        sidecar = SeriesSidecarCache(args.series_cache or None)
+
+    profile = None
+    if args.profile or args.cprofile or args.tracemalloc:
+        profile = RunProfile(cprofile=args.cprofile, tracemalloc=args.tracemalloc)
+        profile.start()
+
+    logging.info(f"Starting data extraction of {len(out_files)} files")
+    try:
+        with (profile or NULL_PROFILE).stage("names"):
+            node_names = read_node_names(args.names)
+        variables = args.variable or DEFAULT_VARIABLES
+        windows = None
+        if args.windows:
+            windows = read_windows(args.windows)
+        elif args.start is not None or args.end is not None:
+            windows = [(args.start, args.end)]
+        events = EventDefinition(args.event_threshold, args.min_inter_event) if args.events else None
+        manifest = None
+        if args.incremental:
+            manifest = open_manifest(args.output, node_names, args.metric, args.nth_max, args.nth_min, variables,
+                                     windows, events)
+        file_tables = extract_files(out_files, node_names, args.metric,
+                                    nth_max_value=args.nth_max, nth_min_value=args.nth_min,
+                                    workers=args.workers, sidecar=sidecar,
+                                    variables=variables, profile=profile, manifest=manifest,
+                                    windows=windows, stream_periods=args.stream_periods, events=events)
+        write_results(file_tables, args.output, output_format, profile=profile)
+    except Exception as e:
+        logging.error(f"An error occurred during extraction: {e}")
+        return 1
+
+    logging.info(f"Data saved to {args.output}")
+    if profile is not None:
+        profile.stop()
+        profile.write(args.output)
+        print(profile.report_text(), file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    sys.exit(main())
@@ -0,0 +1,208 @@
+import os
+import struct
+import logging
+import datetime
+import threading
+import weakref
+import numpy as np
+from swmm_api.output_file.extract import VARIABLES_DICT
+
+# Header-only reading of SWMM .OUT files: the opening records, element names,
+# variable lists, start date, report step and period count, without touching the
+# results section. Used to list elements and validate names in milliseconds.
+
+MAGIC_NUMBER = 516114522
+RECORD_SIZE = 4
+
+# Element kinds in the order of the name section, and the kinds with properties
+NAME_KINDS = ["subcatchment", "node", "link", "pollutant"]
+PROPERTY_KINDS = ["subcatchment", "node", "link"]
+VARIABLE_KINDS = ["subcatchment", "node", "link", "system"]
+
+# SWMM dates are days since this date
+SWMM_EPOCH = datetime.datetime(1899, 12, 30)
+
+# Read buffer used while walking the name section
+READ_BUFFER_BYTES = 1024 * 1024
+
+
+class OutFileHeader:
+    """
+    Metadata of one .OUT file read from its prologue and closing records.
+    `labels` and `variables` are laid out like those of swmm_api's SwmmOutput
+    (per kind, pollutant names appended to the variables), so the header can be
+    used wherever only names and variables are needed.
+    """
+
+    def __init__(self, filename, swmm_version, labels, variables, start_date, report_interval, n_periods,
+                 pos_start_output, bytes_per_period, run_failed=False):
+        self.filename = filename
+        self.swmm_version = swmm_version
+        self.labels = labels
+        self.variables = variables
+        self.start_date = start_date
+        self.report_interval = report_interval
+        self.n_periods = n_periods
+        self.pos_start_output = pos_start_output
+        self.bytes_per_period = bytes_per_period
+        self.run_failed = run_failed
+
+    def contains(self, kind, names):
+        """
+        Boolean array telling which of `names` are elements of `kind` in this file.
+        """
+        index = label_index(self, kind)
+        return np.fromiter((str(name) in index for name in names), dtype=bool, count=len(names))
+
+
+def _read_ints(f, n):
+    return struct.unpack(f'<{n}i', f.read(RECORD_SIZE * n)) if n else ()
+
+
+def read_header(file_path, encoding='utf-8'):
+    """
+    Reads the header of a SWMM .OUT file without reading any results.
+    Raises ValueError if the file is not a SWMM binary output file.
+    """
+    file_size = os.path.getsize(file_path)
+    with open(file_path, 'rb', buffering=READ_BUFFER_BYTES) as f:
+        magic_start, swmm_version, _, n_subcatchments, n_nodes, n_links, n_pollutants = _read_ints(f, 7)
+        if magic_start != MAGIC_NUMBER:
+            raise ValueError(f"{file_path} is not a SWMM binary output file")
+
+        labels = {}
+        for kind, n in zip(NAME_KINDS, (n_subcatchments, n_nodes, n_links, n_pollutants)):
+            names = []
+            for _ in range(n):
+                (length,) = _read_ints(f, 1)
+                names.append(f.read(length).decode(encoding))
+            labels[kind] = names
+        labels["system"] = ['']
+
+        # Pollutant units, then the element properties, which are skipped
+        f.seek(RECORD_SIZE * n_pollutants, os.SEEK_CUR)
+        for kind in PROPERTY_KINDS:
+            (n_properties,) = _read_ints(f, 1)
+            f.seek(RECORD_SIZE * n_properties * (1 + len(labels[kind])), os.SEEK_CUR)
+
+        variables = {}
+        for kind in VARIABLE_KINDS:
+            (n_variables,) = _read_ints(f, 1)
+            _read_ints(f, n_variables)
+            names = list(VARIABLES_DICT[kind])
+            if kind != "system":
+                names += labels["pollutant"]
+            if n_variables != len(names):
+                raise ValueError(f"{file_path} has {n_variables} {kind} variables, expected {len(names)}")
+            variables[kind] = names
+        variables["pollutant"] = []
+
+        (start_days,) = struct.unpack('<d', f.read(8))
+        (report_step,) = _read_ints(f, 1)
+        pos_start_output = f.tell()
+        report_interval = datetime.timedelta(seconds=report_step)
+
+        # The first record may lie one report step after the stored start (see SwmmOutput)
+        start_date = SWMM_EPOCH + datetime.timedelta(days=start_days)
+        first = f.read(8)
+        if len(first) == 8:
+            first_offset = datetime.timedelta(days=struct.unpack('<d', first)[0]) - datetime.timedelta(days=start_days)
+            start_date += report_interval * int(first_offset / report_interval)
+
+        n_values = sum(len(variables[kind]) * len(labels[kind]) for kind in VARIABLE_KINDS)
+        bytes_per_period = RECORD_SIZE * (2 + n_values)
+
+        f.seek(-6 * RECORD_SIZE, os.SEEK_END)
+        _, _, _, n_periods, error_code, magic_end = _read_ints(f, 6)
+
+    run_failed = magic_end != MAGIC_NUMBER or error_code != 0
+    if magic_end != MAGIC_NUMBER:
+        # Incomplete file: count the whole records that were written
+        n_periods = max(0, (file_size - pos_start_output) // bytes_per_period)
+
+    return OutFileHeader(str(file_path), swmm_version, labels, variables, start_date, report_interval, n_periods,
+                         pos_start_output, bytes_per_period, run_failed)
+
+
+# Element name -> position maps per (output or header, kind), built once per object
+_label_indices = weakref.WeakKeyDictionary()
+_label_indices_lock = threading.Lock()
+
+
+def label_index(output, kind):
+    """
+    {element name: position} of the elements of `kind` in an OutFileHeader or a
+    swmm_api SwmmOutput. Built on first use and kept as long as the object lives.
+    """
+    with _label_indices_lock:
+        indices = _label_indices.setdefault(output, {})
+        index = indices.get(kind)
+    if index is None:
+        index = {label: i for i, label in enumerate(output.labels[kind])}
+        with _label_indices_lock:
+            indices[kind] = index
+    return index
+
+
+class HeaderIndex:
+    """
+    Headers of .OUT files, each read once per (path, modification time, size).
+    Thread-safe, so it can be filled from loader threads.
+    """
+
+    def __init__(self):
+        self._headers = {}
+        self._lock = threading.Lock()
+
+    def get(self, file_path):
+        """
+        OutFileHeader of `file_path`, or None if the file cannot be read.
+        """
+        try:
+            stat = os.stat(file_path)
+        except OSError as e:
+            logging.error(f"Could not read the header of {file_path}: {e}")
+            return None
+        key = (os.path.abspath(file_path), stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            header = self._headers.get(key)
+        if header is not None:
+            return header
+
+        try:
+            header = read_header(file_path)
+        except Exception as e:
+            logging.error(f"Could not read the header of {file_path}: {e}")
+            return None
+        with self._lock:
+            self._headers[key] = header
+        return header
+
+    def presence(self, names, file_paths, kinds=("node",)):
+        """
+        (names x files) boolean array telling which names are an element of any of
+        `kinds` in which file, the same rule extraction uses for "Data Not Found".
+        Columns of files that cannot be read are all False.
+        """
+        present = np.zeros((len(names), len(file_paths)), dtype=bool)
+        for j, file_path in enumerate(file_paths):
+            header = self.get(file_path)
+            if header is not None:
+                for kind in kinds:
+                    present[:, j] |= header.contains(kind, names)
+        return present
+
+    def element_names(self, kind, file_paths):
+        """
+        Names of the elements of `kind` in any of the files, in first-seen order.
+        """
+        names = {}
+        for file_path in file_paths:
+            header = self.get(file_path)
+            if header is not None:
+                names.update(dict.fromkeys(header.labels.get(kind, [])))
+        return list(names)
+
+    def clear(self):
+        with self._lock:
+            self._headers.clear()
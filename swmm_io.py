@@ -0,0 +1,499 @@
+import os
+import hashlib
+import logging
+import tempfile
+import threading
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+from swmm_header import read_header, label_index
+
+# Every value in the results section of a SWMM .OUT file is a 4 byte float,
+# except the leading 8 byte timestamp of each report period.
+RECORD_SIZE = 4
+DATE_RECORDS = 2
+
+# Object kinds in the order SWMM writes them inside one report period.
+# Pollutants have no result columns of their own.
+RESULT_KINDS = ["subcatchment", "node", "link", "system"]
+
+# Number of report periods gathered per step when copying columns out of the map
+CHUNK_PERIODS = 4096
+
+# Folder created next to the .OUT files by SeriesSidecarCache when no cache directory is given
+SIDECAR_DIR_NAME = ".swmm_cache"
+
+
+class ReadCancelled(Exception):
+    """
+    Raised by reads that were stopped through their `cancel` event.
+    """
+
+
+def _check_cancel(cancel):
+    if cancel is not None and cancel.is_set():
+        raise ReadCancelled()
+
+
+def element_indices(output, kind, labels):
+    """
+    Resolves the position of each label within the element list of `kind`.
+    Returns (found_labels, indices); labels missing from the file are skipped.
+    """
+    if kind not in RESULT_KINDS:
+        raise ValueError(f"Unknown element type '{kind}'")
+
+    index = label_index(output, kind)
+
+    found_labels = []
+    indices = []
+    for label in labels:
+        i = index.get(str(label))
+        if i is None:
+            continue
+        found_labels.append(label)
+        indices.append(i)
+
+    return found_labels, np.asarray(indices, dtype=np.intp)
+
+
+def column_positions(output, kind, labels, variable):
+    """
+    Resolves the float32 column positions of `variable` for each label of `kind`
+    inside one report period record (timestamp excluded).
+    Returns (found_labels, positions); labels missing from the file are skipped.
+    """
+    found_labels, indices = element_indices(output, kind, labels)
+    if variable not in output.variables[kind]:
+        raise ValueError(f"Variable '{variable}' is not available for element type '{kind}'")
+
+    kind_offset = 0
+    for previous_kind in RESULT_KINDS[:RESULT_KINDS.index(kind)]:
+        kind_offset += len(output.labels[previous_kind]) * len(output.variables[previous_kind])
+
+    n_vars = len(output.variables[kind])
+    var_index = output.variables[kind].index(variable)
+    return found_labels, kind_offset + indices * n_vars + var_index
+
+
+def time_index(output, n_periods):
+    """
+    DatetimeIndex of the first `n_periods` report periods, derived from the header's
+    start date and report step with int64 arithmetic (one allocation, no Python
+    objects per sample). Built once per file and shared by all of its series.
+    """
+    start = np.datetime64(output.start_date, 's').astype(np.int64)
+    step = int(output.report_interval.total_seconds())
+    seconds = start + step * np.arange(n_periods, dtype=np.int64)
+    return pd.DatetimeIndex(seconds.astype("datetime64[s]"))
+
+
+def period_dtype(output):
+    """
+    Structured dtype of one report period record in the results section.
+    """
+    n_values = output.bytes_per_period // RECORD_SIZE - DATE_RECORDS
+    return np.dtype([("datetime", "<f8"), ("values", "<f4", (n_values,))])
+
+
+class SwmmResultsMap:
+    """
+    Read-only np.memmap over the results section of a SWMM .OUT file.
+    Only the header is parsed (swmm_header.read_header); result values are paged in
+    by the OS when a view is actually touched, so multi-GB files never have to fit in RAM.
+    """
+
+    def __init__(self, output, sidecar=None):
+        self.output = output
+        self.labels = output.labels
+        self.variables = output.variables
+        # Optional SeriesSidecarCache that serves decoded series from disk
+        self.sidecar = sidecar
+
+        record = period_dtype(output)
+        available = (os.path.getsize(output.filename) - output.pos_start_output) // record.itemsize
+        n_periods = max(0, min(output.n_periods, available))
+        if n_periods < output.n_periods:
+            logging.warning(f"Results section of {output.filename} ended after {n_periods} of {output.n_periods} periods")
+
+        if n_periods:
+            self.records = np.memmap(output.filename, dtype=record, mode='r',
+                                     offset=output.pos_start_output, shape=(n_periods,))
+        else:
+            self.records = np.empty(0, dtype=record)
+        # Shared by every series read from this file
+        self.index = time_index(output, n_periods)
+        # Bytes of period records and sidecar tables read by blocks(), for RunProfile
+        self.bytes_read = 0
+
+    @property
+    def n_periods(self):
+        return len(self.records)
+
+    def _sidecar_table(self, kind, variable, cancel=None):
+        if self.sidecar is None:
+            return None
+        try:
+            return self.sidecar.table(self, kind, variable, cancel=cancel)
+        except ReadCancelled:
+            raise
+        except Exception as e:
+            logging.warning(f"Series cache unavailable for {self.output.filename}: {e}")
+            return None
+
+    def series(self, kind, label, variable):
+        """
+        Zero-copy float32 view of one (element type, element, variable) series,
+        or None if the element is not in the file.
+        """
+        table = self._sidecar_table(kind, variable)
+        if table is not None:
+            found_labels, indices = element_indices(self.output, kind, [label])
+            return table[indices[0]] if found_labels else None
+
+        found_labels, positions = column_positions(self.output, kind, [label], variable)
+        if not found_labels:
+            return None
+        return self.records["values"][:, positions[0]]
+
+    def get_series(self, kind, label, variable, periods=None):
+        """
+        One series as a float64 pandas Series on the output's DatetimeIndex,
+        or None if the element is not in the file. `periods` (a slice, see
+        periods_between) limits it to a time window; only that part is copied.
+        """
+        values = self.series(kind, label, variable)
+        if values is None:
+            return None
+        periods = periods if periods is not None else slice(None)
+        return pd.Series(values[periods].astype(np.float64), index=self.index[periods], name=label)
+
+    def periods_between(self, start=None, end=None):
+        """
+        Slice of the report periods from `start` to `end` (both inclusive, None for
+        the first / last period), found by binary search on the DatetimeIndex.
+        """
+        first = 0 if start is None else int(self.index.searchsorted(pd.Timestamp(start), side='left'))
+        last = self.n_periods if end is None else int(self.index.searchsorted(pd.Timestamp(end), side='right'))
+        return slice(first, max(first, last))
+
+    def block(self, kind, labels, variable, chunk_periods=CHUNK_PERIODS):
+        """
+        Copies one variable for many elements out of the map in a single sequential
+        pass over the period records.
+        Returns (found_labels, block) where block is a float64 array of shape
+        (periods x found_labels); labels missing from the file are left out.
+        """
+        return self.blocks([(kind, labels, variable)], chunk_periods=chunk_periods)[0]
+
+    def blocks(self, requests, periods=None, chunk_periods=CHUNK_PERIODS, cancel=None):
+        """
+        Like block(), for several (element type, labels, variable) requests at once.
+        All requested columns are gathered together from each chunk of period records,
+        so the file is scanned once no matter how many variables are requested.
+        `periods` (a slice, see periods_between) limits the scan to a time window.
+        `cancel` is an optional event checked between chunks (see stream_blocks).
+        Returns one (found_labels, block) pair per request, in request order.
+        """
+        found, chunks = self.stream_blocks(requests, periods, chunk_periods, cancel)
+        start, stop, _ = (periods if periods is not None else slice(None)).indices(self.n_periods)
+        results = [(found_labels, np.empty((stop - start, len(found_labels)))) for found_labels in found]
+        offset = 0
+        for parts in chunks:
+            n_rows = parts[0].shape[0]
+            for (_, block), part in zip(results, parts):
+                block[offset:offset + n_rows] = part
+            offset += n_rows
+        return results
+
+    def stream_blocks(self, requests, periods=None, chunk_periods=CHUNK_PERIODS, cancel=None):
+        """
+        Chunked form of blocks() for series too long to hold in memory at once.
+        Returns (found_labels of each request, chunks); iterating `chunks` yields, for
+        each run of at most `chunk_periods` report periods within `periods`, a list
+        with one float64 (periods x found_labels) array per request. Records outside
+        `periods` are never read. Once the optional `cancel` event (threading or
+        multiprocessing) is set, the next chunk raises ReadCancelled instead.
+        """
+        start, stop, _ = (periods if periods is not None else slice(None)).indices(self.n_periods)
+        found = []
+        tables = []
+        scan = []
+        offset = 0
+        for kind, labels, variable in requests:
+            table = self._sidecar_table(kind, variable, cancel)
+            if table is not None:
+                found_labels, indices = element_indices(self.output, kind, labels)
+                tables.append((len(found), table, indices))
+            else:
+                found_labels, positions = column_positions(self.output, kind, labels, variable)
+                scan.append((len(found), positions, offset))
+                offset += len(positions)
+            found.append(found_labels)
+
+        positions = np.concatenate([request_positions for _, request_positions, _ in scan]) if scan else []
+        n_columns = len(positions) + sum(len(indices) for _, _, indices in tables)
+
+        def chunks():
+            if not n_columns:
+                return
+            values = self.records["values"]
+            for chunk_start in range(start, stop, chunk_periods):
+                _check_cancel(cancel)
+                chunk_stop = min(chunk_start + chunk_periods, stop)
+                parts = [None] * len(found)
+                if len(positions):
+                    gathered = values[chunk_start:chunk_stop][:, positions].astype(np.float64)
+                    for i, request_positions, request_offset in scan:
+                        parts[i] = gathered[:, request_offset:request_offset + len(request_positions)]
+                    # Every record is paged in, whatever the number of columns gathered from it
+                    self.bytes_read += self.records[chunk_start:chunk_stop].nbytes
+                else:
+                    for i, _, _ in scan:
+                        parts[i] = np.empty((chunk_stop - chunk_start, 0))
+                for i, table, indices in tables:
+                    parts[i] = table[indices, chunk_start:chunk_stop].T.astype(np.float64)
+                    self.bytes_read += len(indices) * (chunk_stop - chunk_start) * table.dtype.itemsize
+                yield parts
+
+        return found, chunks()
+
+    def close(self):
+        """
+        Drops the map; the .OUT file is closed once no series views are left.
+        """
+        self.records = None
+
+
+def open_results_map(file_path, sidecar=None):
+    """
+    Parses the header of a SWMM .OUT file and maps its results section.
+    Returns a SwmmResultsMap or None on error.
+    """
+    try:
+        return SwmmResultsMap(read_header(file_path), sidecar=sidecar)
+    except Exception as e:
+        logging.error(f"[ERROR] Could not map {file_path}: {e}")
+        return None
+
+
+def file_key(file_path):
+    """
+    Identity of a file on disk: (absolute path, modification time in ns, size in bytes).
+    """
+    stat = os.stat(file_path)
+    return os.path.abspath(file_path), stat.st_mtime_ns, stat.st_size
+
+
+def content_hash(file_path, chunk_size=1024 * 1024):
+    """
+    BLAKE2b digest of the full file contents.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class SeriesSidecarCache:
+    """
+    Optional on-disk cache of decoded series. For each (element type, variable)
+    that is read, all elements are written once to a .npy table of shape
+    (elements x periods) so every series is contiguous on disk. Tables are
+    named after the content hash of the .OUT file and are memory-mapped on
+    later runs. The content hash itself is memoized per (path, mtime, size),
+    so unchanged files are only hashed once.
+
+    cache_dir=None keeps the tables in a ".swmm_cache" folder next to each .OUT file.
+    Safe to share between threads: a table is built by one thread at a time, into
+    a temporary file of its own, and published with an atomic rename.
+    """
+
+    def __init__(self, cache_dir=None):
+        self.cache_dir = cache_dir
+        self._build_locks = {}
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        # Handed to worker processes, which build their own locks
+        return {"cache_dir": self.cache_dir}
+
+    def __setstate__(self, state):
+        self.__init__(state["cache_dir"])
+
+    def _build_lock(self, path):
+        with self._lock:
+            return self._build_locks.setdefault(path, threading.Lock())
+
+    def directory(self, file_path):
+        if self.cache_dir is not None:
+            return self.cache_dir
+        return os.path.join(os.path.dirname(os.path.abspath(file_path)), SIDECAR_DIR_NAME)
+
+    def file_hash(self, file_path):
+        """
+        Content hash of `file_path`, memoized under the file's (path, mtime, size).
+        """
+        directory = self.directory(file_path)
+        key = "|".join(str(part) for part in file_key(file_path))
+        memo_path = os.path.join(directory, hashlib.sha1(key.encode('utf-8')).hexdigest() + ".hash")
+        if os.path.exists(memo_path):
+            with open(memo_path, 'r') as f:
+                return f.read().strip()
+
+        file_hash = content_hash(file_path)
+        os.makedirs(directory, exist_ok=True)
+        _write_atomic(memo_path, lambda f: f.write(file_hash.encode('utf-8')))
+        return file_hash
+
+    def table_path(self, file_path, kind, variable):
+        return os.path.join(self.directory(file_path), f"{self.file_hash(file_path)}_{kind}_{variable}.npy")
+
+    def table(self, results_map, kind, variable, cancel=None):
+        """
+        Returns the (elements x periods) float32 table of `variable` for all elements
+        of `kind`, memory-mapped from disk. It is built on the first request; setting
+        the optional `cancel` event stops the build between chunks (ReadCancelled).
+        """
+        file_path = str(results_map.output.filename)
+        path = self.table_path(file_path, kind, variable)
+        shape = (len(results_map.labels[kind]), results_map.n_periods)
+
+        table = _load_table(path, shape)
+        if table is not None:
+            return table
+
+        with self._build_lock(path):
+            # Another thread may have built it while this one waited
+            table = _load_table(path, shape)
+            if table is not None:
+                return table
+
+            found_labels, positions = column_positions(results_map.output, kind, results_map.labels[kind], variable)
+            values = results_map.records["values"]
+
+            def write(tmp_path):
+                table = np.lib.format.open_memmap(tmp_path, mode='w+', dtype=np.float32, shape=shape)
+                for start in range(0, shape[1], CHUNK_PERIODS):
+                    _check_cancel(cancel)
+                    stop = start + CHUNK_PERIODS
+                    table[:, start:stop] = values[start:stop][:, positions].T
+                table.flush()
+                del table
+
+            _replace_atomic(path, write)
+            logging.info(f"Wrote series cache {path}")
+        return np.load(path, mmap_mode='r')
+
+
+def _load_table(path, shape):
+    """
+    Memory-maps a cached table, or returns None if it is missing. A table that is
+    unreadable or has the wrong shape is deleted, so it gets rebuilt.
+    """
+    if not os.path.exists(path):
+        return None
+    try:
+        table = np.load(path, mmap_mode='r')
+        if table.shape == shape:
+            return table
+        logging.warning(f"Discarding series cache {path} with unexpected shape {table.shape}")
+    except (ValueError, OSError) as e:
+        logging.warning(f"Discarding unreadable series cache {path}: {e}")
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+    return None
+
+
+def _replace_atomic(path, write):
+    """
+    Calls write(tmp_path) on a temporary file unique to this call, next to `path`,
+    then renames it to `path`, so readers never see a partly written file.
+    """
+    fd, tmp_path = tempfile.mkstemp(prefix=os.path.basename(path) + ".", suffix=".tmp",
+                                    dir=os.path.dirname(path))
+    os.close(fd)
+    try:
+        write(tmp_path)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def _write_atomic(path, write):
+    def write_file(tmp_path):
+        with open(tmp_path, 'wb') as f:
+            write(f)
+
+    _replace_atomic(path, write_file)
+
+
+class ResultsMapCache:
+    """
+    LRU cache of opened SwmmResultsMap objects shared by extraction and visualization.
+    Entries are keyed by absolute path, modification time and size, so a file that
+    was re-simulated is re-opened. The budget is a maximum number of entries and,
+    optionally, a maximum number of mapped result bytes; the least recently used
+    entries are dropped first. Evicted maps are not closed explicitly because a
+    caller may still be reading from them; they close once no longer referenced.
+    """
+
+    def __init__(self, max_entries=16, max_bytes=None, sidecar=None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        # SeriesSidecarCache handed to every map served by this cache (None disables it)
+        self.sidecar = sidecar
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, file_path):
+        """
+        Returns the cached SwmmResultsMap for `file_path`, opening it on a miss.
+        Returns None if the file cannot be opened.
+        """
+        try:
+            key = file_key(file_path)
+        except OSError as e:
+            logging.error(f"[ERROR] Could not access {file_path}: {e}")
+            return None
+
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self._entries[key].sidecar = self.sidecar
+                return self._entries[key]
+
+        results_map = open_results_map(file_path, sidecar=self.sidecar)
+        if results_map is None:
+            return None
+
+        with self._lock:
+            # Drop stale entries of the same file (changed mtime or size)
+            for stale_key in [k for k in self._entries if k[0] == key[0]]:
+                del self._entries[stale_key]
+            self._entries[key] = results_map
+            self._evict()
+        return results_map
+
+    def _evict(self):
+        while len(self._entries) > 1 and (
+                len(self._entries) > self.max_entries or
+                (self.max_bytes is not None and self.mapped_bytes() > self.max_bytes)):
+            self._entries.popitem(last=False)
+
+    def mapped_bytes(self):
+        return sum(results_map.records.nbytes for results_map in self._entries.values())
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
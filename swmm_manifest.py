@@ -0,0 +1,123 @@
+import os
+import json
+import hashlib
+import logging
+import pandas as pd
+from swmm_io import content_hash, file_key
+
+# Bumped whenever the stored tables or the manifest layout change
+MANIFEST_VERSION = 1
+MANIFEST_FILE_NAME = "manifest.json"
+
+
+def manifest_directory(save_path):
+    """
+    Folder holding the manifest of an export: "<export name>.manifest" next to it.
+    """
+    return os.path.splitext(save_path)[0] + ".manifest"
+
+
+def extraction_config(names, selected_metrics, nth_max_value=None, nth_min_value=None, variables=(), windows=None,
+                      events=None):
+    """
+    Digest of everything besides the .OUT file that a per-file result table depends on.
+    """
+    config = {
+        "version": MANIFEST_VERSION,
+        "names": [str(name) for name in names],
+        "metrics": list(selected_metrics),
+        "nth_max": nth_max_value,
+        "nth_min": nth_min_value,
+        "variables": [list(pair) for pair in variables],
+        "windows": [[str(start), str(end)] for start, end in windows] if windows else None,
+        "events": list(events) if events else None,
+    }
+    return hashlib.sha1(json.dumps(config, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+class ExtractionManifest:
+    """
+    Per-file results of earlier extractions to the same export, for incremental runs.
+    Every .OUT file is recorded with its size, modification time and content hash,
+    the digest of the extraction settings and its pickled result table. lookup()
+    returns the stored table when the file and the settings are unchanged; a file
+    whose modification time changed but whose content did not is reused as well.
+    Tables are only stored from the process that owns the manifest (the caller of
+    extract_files), so concurrent workers never write to it.
+    """
+
+    def __init__(self, directory, config):
+        self.directory = directory
+        self.config = config
+        self.entries = {}
+        path = os.path.join(directory, MANIFEST_FILE_NAME)
+        if os.path.exists(path):
+            try:
+                with open(path, 'r') as f:
+                    data = json.load(f)
+                if data.get("version") == MANIFEST_VERSION:
+                    self.entries = data.get("files", {})
+            except (OSError, ValueError) as e:
+                logging.warning(f"Ignoring unreadable manifest {path}: {e}")
+
+    @classmethod
+    def for_export(cls, save_path, names, selected_metrics, nth_max_value=None, nth_min_value=None, variables=(),
+                   windows=None, events=None):
+        return cls(manifest_directory(save_path),
+                   extraction_config(names, selected_metrics, nth_max_value, nth_min_value, variables, windows,
+                                     events))
+
+    def _table_path(self, file_path):
+        return os.path.join(self.directory, hashlib.sha1(file_path.encode('utf-8')).hexdigest() + ".pkl")
+
+    def lookup(self, out_file):
+        """
+        Stored result table of `out_file` if neither the file nor the settings changed, else None.
+        """
+        try:
+            file_path, mtime_ns, size = file_key(out_file)
+        except OSError:
+            return None
+        entry = self.entries.get(file_path)
+        if entry is None or entry["config"] != self.config or entry["size"] != size:
+            return None
+
+        if entry["mtime_ns"] != mtime_ns:
+            # Touched or re-simulated: only the content tells
+            if content_hash(out_file) != entry["hash"]:
+                return None
+            entry["mtime_ns"] = mtime_ns
+            self._save()
+
+        try:
+            return pd.read_pickle(self._table_path(file_path))
+        except Exception as e:
+            logging.warning(f"Stored results of {out_file} unusable, extracting again: {e}")
+            return None
+
+    def store(self, out_file, table, identity):
+        """
+        Records the result table of `out_file`. `identity` is its (size, mtime_ns,
+        content hash), taken before the file was read. Tables of files that could not
+        be opened or read are not stored, so such files are retried on the next run.
+        """
+        status = table["Status"].astype(object)
+        if ((status == "Error") & table["Element type"].isna()).any():
+            return
+
+        file_path = os.path.abspath(out_file)
+        size, mtime_ns, file_hash = identity
+        os.makedirs(self.directory, exist_ok=True)
+        table_path = self._table_path(file_path)
+        tmp_path = f"{table_path}.{os.getpid()}.tmp"
+        table.to_pickle(tmp_path)
+        os.replace(tmp_path, table_path)
+        self.entries[file_path] = {"size": size, "mtime_ns": mtime_ns, "hash": file_hash, "config": self.config}
+        self._save()
+
+    def _save(self):
+        path = os.path.join(self.directory, MANIFEST_FILE_NAME)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump({"version": MANIFEST_VERSION, "files": self.entries}, f, indent=1)
+        os.replace(tmp_path, path)
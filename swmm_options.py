@@ -0,0 +1,33 @@
+import os
+
+# Option lists shared by the GUI, the command line and the extraction workers.
+# This module must not import numpy, pandas or swmm_api, so the main window can
+# be built before any of the heavy modules are loaded.
+
+METRIC_OPTIONS = ["1st Max", "2nd Max", "3rd Max", "4th Max", "5th Max", "Minimum"]
+EXPORT_EXTENSIONS = {"Excel": ".xlsx", "CSV": ".csv", "TXT": ".txt", "Parquet": ".parquet"}
+
+
+def default_workers():
+    """
+    Number of worker processes used when the caller does not choose one.
+    """
+    return os.cpu_count() or 1
+
+
+# (element type, variable) pairs offered for extraction; the first one is the default
+EXTRACTION_VARIABLES = [
+    ("node", "total_inflow"),
+    ("node", "depth"),
+    ("node", "flooding"),
+    ("link", "flow"),
+    ("link", "velocity"),
+    ("link", "capacity"),
+    ("subcatchment", "runoff"),
+]
+DEFAULT_VARIABLES = EXTRACTION_VARIABLES[:1]
+
+# Defaults of event-based peaks: values above the threshold form events, and dry
+# spells shorter than the minimum inter-event time do not split an event
+EVENT_THRESHOLD = 0.0
+MIN_INTER_EVENT_HOURS = 6.0
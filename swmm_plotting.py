@@ -0,0 +1,294 @@
+import time
+import logging
+import threading
+import webbrowser
+from functools import partial
+from collections import OrderedDict
+import numpy as np
+
+# Plotting helpers shared by the matplotlib and Bokeh views. Only numpy is imported
+# at module level; plotting libraries are imported by the functions that need them.
+
+# Plot width in pixels used when the requested width is not a positive number
+DEFAULT_PLOT_WIDTH = 800
+
+# Seconds OverlayServer waits for a browser page to connect before opening another one
+BROWSER_RETRY_SECONDS = 10
+
+
+def minmax_indices(values, n_buckets):
+    """
+    Per-pixel min/max decimation. Splits `values` into `n_buckets` consecutive buckets
+    and keeps the position of the smallest and the largest sample of each bucket, plus
+    the first and last sample. Every local extreme that can be seen at that resolution,
+    and in particular every peak value, is kept exactly.
+    Returns the sorted positions to keep (all positions if there is nothing to gain).
+    """
+    values = np.asarray(values, dtype=np.float64)
+    n_values = len(values)
+    n_buckets = max(int(n_buckets), 1)
+    if n_values <= 2 * n_buckets + 2:
+        return np.arange(n_values)
+
+    bucket_size = -(-n_values // n_buckets)
+    n_buckets = -(-n_values // bucket_size)
+    padding = n_buckets * bucket_size - n_values
+
+    # Missing values and padding never win a bucket unless the whole bucket is missing
+    high = np.concatenate([np.where(np.isnan(values), -np.inf, values), np.full(padding, -np.inf)])
+    low = np.concatenate([np.where(np.isnan(values), np.inf, values), np.full(padding, np.inf)])
+    starts = np.arange(n_buckets) * bucket_size
+    keep = np.concatenate([
+        [0, n_values - 1],
+        starts + high.reshape(n_buckets, bucket_size).argmax(axis=1),
+        starts + low.reshape(n_buckets, bucket_size).argmin(axis=1),
+    ])
+    return np.unique(keep[keep < n_values])
+
+
+def decimate(data, width):
+    """
+    Decimates a pandas Series or DataFrame (first column) to roughly two points per
+    pixel of a plot `width` pixels wide, keeping all peaks and troughs exact.
+    Returns the same object when it is already small enough.
+    """
+    try:
+        width = int(width)
+    except (TypeError, ValueError):
+        width = DEFAULT_PLOT_WIDTH
+    if width <= 0:
+        width = DEFAULT_PLOT_WIDTH
+
+    values = data.to_numpy() if data.ndim == 1 else data.iloc[:, 0].to_numpy()
+    keep = minmax_indices(values, width)
+    if len(keep) == len(data):
+        return data
+    return data.iloc[keep]
+
+
+def series_columns(index, values):
+    """
+    Column data of one series as NumPy arrays: "x" holds the timestamps as float64
+    milliseconds since the epoch (what a Bokeh datetime axis uses) and "y" the values
+    as float64. Bokeh serializes such columns as binary arrays instead of lists of
+    Python objects.
+    """
+    times = np.asarray(index, dtype="datetime64[ms]").astype(np.int64).astype(np.float64)
+    return {"x": times, "y": np.asarray(values, dtype=np.float64)}
+
+
+def overlay_figure(lines, title, width, height):
+    """
+    Builds the Bokeh overlay figure shared by the on-screen plot and the HTML/PNG exports.
+    `lines` is a list of (legend label, color, columns) tuples, one per line, where
+    columns come from series_columns(). The arrays are shared, not copied, by the
+    ColumnDataSource of each figure.
+    """
+    from bokeh.plotting import figure
+    from bokeh.models import ColumnDataSource, Legend
+
+    bokeh_fig = figure(
+        x_axis_type="datetime",
+        width=width,
+        height=height,
+        background_fill_color="#FFFFFF",
+        title=title
+    )
+
+    legend_items = []
+    for label, color, columns in lines:
+        source = ColumnDataSource(data=dict(columns))
+        r = bokeh_fig.line(x="x", y="y", source=source, line_color=color, line_width=2, alpha=0.8)
+        legend_items.append((label, [r]))
+
+    if legend_items:
+        legend = Legend(items=legend_items, location="top_left")
+        bokeh_fig.add_layout(legend, 'right')
+    return bokeh_fig
+
+
+class OverlayServer:
+    """
+    Local Bokeh server that keeps one overlay page open in the browser. show() only
+    pushes the changed column data, title and colors to every connected page, so
+    switching nodes or changing time shifts neither re-embeds all data nor opens a
+    new tab. The server runs its own event loop in a daemon thread, started on first use.
+    """
+
+    def __init__(self, address="localhost", port=0):
+        self.address = address
+        self.port = port
+        self._server = None
+        self._thread = None
+        self._lock = threading.Lock()
+        # Last shown (lines, title, width, height); new pages start from it
+        self._state = None
+        # Connected document -> (figure, legend, {label: (renderer, legend item)})
+        self._documents = {}
+        self._last_open = None
+
+    @property
+    def url(self):
+        return f"http://{self.address}:{self._server.port}/"
+
+    def start(self):
+        """
+        Starts the server thread if it is not running yet; raises if the server cannot start.
+        """
+        if self._thread is not None:
+            return
+
+        ready = threading.Event()
+        errors = []
+
+        def run():
+            import asyncio
+            from tornado.ioloop import IOLoop
+            from bokeh.server.server import Server
+            from bokeh.application import Application
+            from bokeh.application.handlers.function import FunctionHandler
+
+            try:
+                asyncio.set_event_loop(asyncio.new_event_loop())
+                self._server = Server({"/": Application(FunctionHandler(self._init_document))},
+                                      io_loop=IOLoop.current(), address=self.address, port=self.port)
+                self._server.start()
+            except Exception as e:
+                errors.append(e)
+                ready.set()
+                return
+            ready.set()
+            self._server.io_loop.start()
+
+        thread = threading.Thread(target=run, name="overlay-server", daemon=True)
+        thread.start()
+        if not ready.wait(timeout=30):
+            raise RuntimeError("Timed out starting the Bokeh server")
+        if errors:
+            raise errors[0]
+        self._thread = thread
+        logging.info(f"Overlay server running at {self.url}")
+
+    def show(self, lines, title, width, height):
+        """
+        Displays the overlay `lines` (see overlay_figure) on every connected page,
+        opening the page in the browser if none is connected.
+        """
+        self.start()
+        with self._lock:
+            self._state = (list(lines), title, width, height)
+            documents = list(self._documents)
+
+        for doc in documents:
+            # The only thread-safe way to modify a server document
+            doc.add_next_tick_callback(partial(self._apply, doc))
+
+        now = time.monotonic()
+        if not documents and (self._last_open is None or now - self._last_open > BROWSER_RETRY_SECONDS):
+            self._last_open = now
+            webbrowser.open(self.url)
+
+    def stop(self):
+        if self._thread is None:
+            return
+        self._server.io_loop.add_callback(self._server.io_loop.stop)
+        self._thread = None
+        with self._lock:
+            self._documents.clear()
+
+    def _init_document(self, doc):
+        from bokeh.plotting import figure
+        from bokeh.models import Legend
+
+        bokeh_fig = figure(x_axis_type="datetime", background_fill_color="#FFFFFF")
+        legend = Legend(items=[], location="top_left")
+        bokeh_fig.add_layout(legend, 'right')
+        doc.add_root(bokeh_fig)
+        doc.title = "Overlay"
+        doc.on_session_destroyed(partial(self._forget, doc))
+
+        with self._lock:
+            self._documents[doc] = (bokeh_fig, legend, {})
+        self._apply(doc)
+
+    def _forget(self, doc, session_context):
+        with self._lock:
+            self._documents.pop(doc, None)
+
+    def _apply(self, doc):
+        """
+        Brings one connected document up to date with the last shown state.
+        Runs on the server thread with the document locked.
+        """
+        from bokeh.models import ColumnDataSource, LegendItem
+
+        with self._lock:
+            state = self._state
+            entry = self._documents.get(doc)
+        if state is None or entry is None:
+            return
+
+        lines, title, width, height = state
+        bokeh_fig, legend, renderers = entry
+        bokeh_fig.title.text = title
+        bokeh_fig.width = width
+        bokeh_fig.height = height
+
+        shown = set()
+        for label, color, columns in lines:
+            if label in renderers:
+                r, item = renderers[label]
+                r.data_source.data = dict(columns)
+                r.glyph.line_color = color
+            else:
+                r = bokeh_fig.line(x="x", y="y", source=ColumnDataSource(data=dict(columns)),
+                                   line_color=color, line_width=2, alpha=0.8)
+                item = LegendItem(label=label, renderers=[r])
+                legend.items.append(item)
+                renderers[label] = (r, item)
+            r.visible = item.visible = True
+            shown.add(label)
+
+        # Files without data for this node stay in the page, hidden
+        for label, (r, item) in renderers.items():
+            if label not in shown:
+                r.visible = item.visible = False
+
+
+class SeriesPrefetcher:
+    """
+    Bounded cache of background loads for a navigator that shows one series at a time.
+    get() returns the Future of a key, submitting load(*key) to `executor` on a miss;
+    prefetch() starts loads for keys likely to be shown next. Only the `max_entries`
+    most recently requested keys are kept and loads that fell out are cancelled,
+    so memory stays flat however many keys the navigator has.
+    Not thread-safe: call it from one thread (the Tk main loop).
+    """
+
+    def __init__(self, executor, load, max_entries=8):
+        self.executor = executor
+        self.load = load
+        self.max_entries = max(max_entries, 3)
+        self._entries = OrderedDict()
+
+    def get(self, key):
+        if key in self._entries:
+            self._entries.move_to_end(key)
+        else:
+            self._entries[key] = self.executor.submit(self.load, *key)
+            self._evict()
+        return self._entries[key]
+
+    def prefetch(self, keys):
+        for key in keys:
+            if key not in self._entries:
+                self._entries[key] = self.executor.submit(self.load, *key)
+        self._evict()
+
+    def _evict(self):
+        while len(self._entries) > self.max_entries:
+            _, future = self._entries.popitem(last=False)
+            future.cancel()
+
+    def __len__(self):
+        return len(self._entries)
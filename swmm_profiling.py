@@ -0,0 +1,197 @@
+import io
+import os
+import json
+import time
+import logging
+from contextlib import contextmanager
+
+# Stages of one extraction run, in pipeline order
+STAGES = ["names", "manifest", "hash", "parse", "read", "peaks", "table", "write"]
+STAGE_DESCRIPTIONS = {
+    "names": "read the element name list",
+    "manifest": "look up unchanged files (incremental runs)",
+    "hash": "content hash of new or changed files (incremental runs)",
+    "parse": "open .OUT files (header + memory map)",
+    "read": "copy series out of the files",
+    "peaks": "peak and minimum statistics",
+    "table": "build the long-format result tables",
+    "write": "write the export file",
+}
+
+# Counters of one extraction run, in report order
+COUNTERS = ["files_reused", "files_parsed", "series_read", "bytes_read", "peaks_found", "rows_written"]
+
+# Functions listed from the cProfile capture in the text report
+PROFILE_TOP_FUNCTIONS = 25
+# Allocation sites listed from the tracemalloc capture in the text report
+TRACEMALLOC_TOP_LINES = 10
+
+
+class RunProfile:
+    """
+    Per-stage wall-clock timers and counters of one extraction run, optionally
+    with a cProfile and tracemalloc capture of the calling process.
+    Worker processes record into their own RunProfile and hand back as_dict(),
+    which the caller merge()s, so stage times are summed over all workers.
+    """
+
+    def __init__(self, cprofile=False, tracemalloc=False):
+        self.timings = {}
+        self.counters = {}
+        self.started = time.perf_counter()
+        self.wall_seconds = None
+        self.cprofile = cprofile
+        self.tracemalloc = tracemalloc
+        self._profiler = None
+        self._profile_text = None
+        self._memory_text = None
+        self.peak_traced_mb = None
+
+    @contextmanager
+    def stage(self, name):
+        """
+        Adds the time spent in the `with` block to stage `name`.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(name, time.perf_counter() - start)
+
+    def add_time(self, name, seconds, calls=1):
+        timing = self.timings.setdefault(name, [0.0, 0])
+        timing[0] += seconds
+        timing[1] += calls
+
+    def count(self, name, n=1):
+        self.counters[name] = self.counters.get(name, 0) + int(n)
+
+    def merge(self, data):
+        """
+        Adds the timings and counters of another profile's as_dict().
+        """
+        for name, timing in data.get("stages", {}).items():
+            self.add_time(name, timing["seconds"], timing["calls"])
+        for name, value in data.get("counters", {}).items():
+            self.count(name, value)
+
+    def start(self):
+        """
+        Starts the run clock and the optional cProfile / tracemalloc captures.
+        """
+        self.started = time.perf_counter()
+        self.wall_seconds = None
+        if self.cprofile:
+            import cProfile
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+        if self.tracemalloc:
+            import tracemalloc
+            tracemalloc.start()
+
+    def stop(self):
+        """
+        Stops the run clock and the optional captures; does nothing if already stopped.
+        """
+        if self.wall_seconds is not None:
+            return
+        self.wall_seconds = time.perf_counter() - self.started
+        if self._profiler is not None:
+            import pstats
+            self._profiler.disable()
+            stats_profiler, self._profiler = self._profiler, None
+            text = io.StringIO()
+            pstats.Stats(stats_profiler, stream=text).sort_stats("cumulative").print_stats(PROFILE_TOP_FUNCTIONS)
+            self._profile_text = text.getvalue()
+        if self.tracemalloc:
+            import tracemalloc
+            if tracemalloc.is_tracing():
+                snapshot = tracemalloc.take_snapshot()
+                self.peak_traced_mb = tracemalloc.get_traced_memory()[1] / 1024 ** 2
+                tracemalloc.stop()
+                lines = [str(stat) for stat in snapshot.statistics("lineno")[:TRACEMALLOC_TOP_LINES]]
+                self._memory_text = "\n".join(lines)
+
+    def as_dict(self):
+        data = {
+            "stages": {name: {"seconds": seconds, "calls": calls} for name, (seconds, calls) in self.timings.items()},
+            "counters": dict(self.counters),
+        }
+        if self.wall_seconds is not None:
+            data["wall_seconds"] = self.wall_seconds
+        if self.peak_traced_mb is not None:
+            data["peak_traced_mb"] = self.peak_traced_mb
+        return data
+
+    def report_text(self):
+        """
+        Human-readable timing report.
+        """
+        lines = []
+        if self.wall_seconds is not None:
+            lines.append(f"Wall time: {self.wall_seconds:.3f} s")
+        lines.append("Stage times (summed over worker processes):")
+        names = STAGES + sorted(name for name in self.timings if name not in STAGES)
+        for name in names:
+            if name in self.timings:
+                seconds, calls = self.timings[name]
+                description = STAGE_DESCRIPTIONS.get(name, "")
+                lines.append(f"  {name:<10}{seconds:>10.3f} s  {calls:>7} calls  {description}")
+
+        lines.append("Counters:")
+        for name in COUNTERS + sorted(name for name in self.counters if name not in COUNTERS):
+            if name in self.counters:
+                value = self.counters[name]
+                if name == "bytes_read":
+                    lines.append(f"  {name:<14}{value / 1024 ** 2:>14,.1f} MB")
+                else:
+                    lines.append(f"  {name:<14}{value:>14,}")
+
+        if self.wall_seconds:
+            rates = [(name, unit) for name, unit in (("series_read", "series"), ("rows_written", "rows"))
+                     if self.counters.get(name)]
+            for name, unit in rates:
+                label = f"{unit}/s"
+                lines.append(f"  {label:<14}{self.counters[name] / self.wall_seconds:>14,.0f}")
+
+        if self.peak_traced_mb is not None:
+            lines.append(f"Peak traced memory (this process): {self.peak_traced_mb:.1f} MB")
+        if self._memory_text:
+            lines.append("Top allocations:")
+            lines.append(self._memory_text)
+        if self._profile_text:
+            lines.append("cProfile (this process, by cumulative time):")
+            lines.append(self._profile_text)
+        return "\n".join(lines)
+
+    def write(self, export_path):
+        """
+        Writes the report next to the export: <name>.profile.json and <name>.profile.txt.
+        Returns the path of the text report.
+        """
+        base = os.path.splitext(export_path)[0] + ".profile"
+        with open(base + ".json", 'w') as f:
+            json.dump(self.as_dict(), f, indent=2)
+        with open(base + ".txt", 'w', encoding='utf-8') as f:
+            f.write(self.report_text() + "\n")
+        logging.info(f"Timing report written to {base}.txt")
+        return base + ".txt"
+
+
+class NullProfile:
+    """
+    Stand-in used when no profile is requested; records nothing.
+    """
+
+    @contextmanager
+    def stage(self, name):
+        yield
+
+    def add_time(self, name, seconds, calls=1):
+        pass
+
+    def count(self, name, n=1):
+        pass
+
+
+NULL_PROFILE = NullProfile()
@@ -0,0 +1,407 @@
+from collections import namedtuple
+import numpy as np
+
+# Number of element columns processed at once, bounds the temporary arrays
+# to (periods x CHUNK_COLUMNS) no matter how many nodes are requested.
+CHUNK_COLUMNS = 2048
+
+
+def local_maxima_mask(block):
+    """
+    Vectorized equivalent of scipy.signal.find_peaks (without conditions) applied
+    to every column of a (time x elements) array.
+    A sample is a peak if it is strictly higher than its left neighbour and the
+    next differing sample to the right is lower. Flat peaks are marked once, at
+    the middle of the plateau (rounded down), exactly like find_peaks. The first
+    and last samples are never peaks.
+    """
+    block = np.asarray(block)
+    n_periods = block.shape[0]
+    mask = np.zeros(block.shape, dtype=bool)
+    if n_periods < 3:
+        return mask
+
+    step = np.sign(np.diff(block, axis=0))
+    sentinel = n_periods - 1
+
+    # Index of the next non-flat step at or after each step (sentinel if none)
+    rows = np.arange(n_periods - 1)[:, None]
+    nonflat = np.where(step != 0, rows, sentinel)
+    next_nonflat = np.minimum.accumulate(nonflat[::-1], axis=0)[::-1]
+    # ... strictly after each step
+    after = np.empty_like(next_nonflat)
+    after[:-1] = next_nonflat[1:]
+    after[-1] = sentinel
+
+    has_next = after < sentinel
+    falls = np.take_along_axis(step, np.minimum(after, sentinel - 1), axis=0) < 0
+    is_peak = (step > 0) & has_next & falls
+
+    # Step j rises into sample j + 1, the plateau runs to sample after[j]
+    rise, column = np.nonzero(is_peak)
+    mask[(rise + 1 + after[rise, column]) // 2, column] = True
+    return mask
+
+
+def _largest(values, n):
+    """
+    The n largest values of every column, sorted in descending order.
+    """
+    n_rows = values.shape[0]
+    if n >= n_rows:
+        return -np.sort(-values, axis=0)
+    top = -np.partition(-values, n - 1, axis=0)[:n]
+    return -np.sort(-top, axis=0)
+
+
+def _smallest(values, n):
+    """
+    The n smallest values of every column, sorted in ascending order.
+    """
+    n_rows = values.shape[0]
+    if n >= n_rows:
+        return np.sort(values, axis=0)
+    return np.sort(np.partition(values, n - 1, axis=0)[:n], axis=0)
+
+
+def peak_statistics(block, n_max=0, n_min=0, chunk_columns=CHUNK_COLUMNS):
+    """
+    Computes the 1st..n_max largest peaks and the 1st..n_min smallest values of
+    every column of a (time x elements) array using np.partition.
+    Returns a dict with
+        "peaks":       (n_max x elements) peaks in descending order, NaN where a column has fewer peaks
+        "peak_counts": number of peaks per column
+        "minimum":     column minimum, NaN for an empty series
+        "minima":      (n_min x elements) smallest values in ascending order, NaN where unavailable
+    The values are identical to sorting the find_peaks values / the whole series per column.
+    """
+    block = np.asarray(block, dtype=np.float64)
+    n_periods, n_columns = block.shape
+
+    peaks = np.full((n_max, n_columns), np.nan)
+    peak_counts = np.zeros(n_columns, dtype=np.int64)
+    minimum = np.full(n_columns, np.nan)
+    minima = np.full((n_min, n_columns), np.nan)
+
+    if n_periods:
+        for start in range(0, n_columns, chunk_columns):
+            columns = slice(start, start + chunk_columns)
+            chunk = block[:, columns]
+            minimum[columns] = chunk.min(axis=0)
+
+            if n_max:
+                mask = local_maxima_mask(chunk)
+                peak_counts[columns] = mask.sum(axis=0)
+                top = _largest(np.where(mask, chunk, -np.inf), n_max)
+                top[np.arange(top.shape[0])[:, None] >= peak_counts[columns]] = np.nan
+                peaks[:top.shape[0], columns] = top
+
+            if n_min:
+                low = _smallest(chunk, n_min)
+                minima[:low.shape[0], columns] = low
+
+    return {"peaks": peaks, "peak_counts": peak_counts, "minimum": minimum, "minima": minima}
+
+
+class PeakAccumulator:
+    """
+    Running version of peak_statistics for series that arrive in chunks of periods,
+    so a multi-year .OUT file can be processed with memory bounded by one chunk.
+    The result is identical to peak_statistics on the concatenated series: the last
+    sample of each chunk and the last value before it that differs from it are
+    carried into the next chunk, so a peak or plateau on a chunk boundary is found
+    exactly once. end_segment() closes the series; the next chunk then starts a new
+    one whose first sample cannot be a peak (used for separate time windows).
+    """
+
+    def __init__(self, n_columns, n_max=0, n_min=0, chunk_columns=CHUNK_COLUMNS):
+        self.n_max = n_max
+        self.n_min = n_min
+        self.chunk_columns = chunk_columns
+        self.n_periods = 0
+        self.peak_counts = np.zeros(n_columns, dtype=np.int64)
+        self.top = np.full((n_max, n_columns), -np.inf)
+        self.low = np.full((n_min, n_columns), np.inf)
+        self.minimum = np.full(n_columns, np.inf)
+        # Last sample of the open segment and the last value before it that differs
+        self._last = None
+        self._before_last = None
+
+    def update(self, chunk):
+        """
+        Adds the next (periods x elements) chunk of the open segment.
+        """
+        chunk = np.asarray(chunk, dtype=np.float64)
+        n_rows, n_columns = chunk.shape
+        if not n_rows:
+            return
+        self.n_periods += n_rows
+        carry = self._last is not None
+        if self.n_max and not carry:
+            self._last = np.empty(n_columns)
+            self._before_last = np.empty(n_columns)
+
+        for start in range(0, n_columns, self.chunk_columns):
+            columns = slice(start, start + self.chunk_columns)
+            part = chunk[:, columns]
+            self.minimum[columns] = np.minimum(self.minimum[columns], part.min(axis=0))
+
+            if self.n_min:
+                self.low[:, columns] = _smallest(np.concatenate([self.low[:, columns], part]), self.n_min)
+
+            if self.n_max:
+                if carry:
+                    part = np.concatenate([self._before_last[None, columns], self._last[None, columns], part])
+                mask = local_maxima_mask(part)
+                self.peak_counts[columns] += mask.sum(axis=0)
+                found = _largest(np.where(mask, part, -np.inf), self.n_max)
+                self.top[:, columns] = _largest(np.concatenate([self.top[:, columns], found]), self.n_max)
+
+                last = part[-1]
+                differs = part != last
+                position = part.shape[0] - 1 - np.argmax(differs[::-1], axis=0)
+                before = part[position, np.arange(part.shape[1])]
+                self._before_last[columns] = np.where(differs.any(axis=0), before, last)
+                self._last[columns] = last
+
+    def end_segment(self):
+        """
+        Closes the open segment; a peak still pending at its end is not a peak.
+        """
+        self._last = None
+        self._before_last = None
+
+    def result(self):
+        """
+        The statistics so far, in the format of peak_statistics.
+        """
+        peaks = self.top.copy()
+        peaks[np.arange(self.n_max)[:, None] >= self.peak_counts] = np.nan
+        minima = self.low.copy()
+        minima[np.arange(self.n_min) >= self.n_periods] = np.nan
+        minimum = self.minimum.copy() if self.n_periods else np.full(len(self.minimum), np.nan)
+        return {"peaks": peaks, "peak_counts": self.peak_counts.copy(), "minimum": minimum, "minima": minima}
+
+
+class EventDefinition(namedtuple("EventDefinition", ["threshold", "min_gap_hours"])):
+    """
+    How a series is split into independent events: an event is a run of values above
+    `threshold`, and runs separated by less than `min_gap_hours` (the minimum
+    inter-event time) at or below the threshold belong to the same event.
+    """
+
+    def gap_periods(self, step_seconds):
+        """
+        Smallest number of report periods at or below the threshold that separates two events.
+        """
+        return max(1, int(np.ceil(self.min_gap_hours * 3600 / step_seconds - 1e-9)))
+
+
+def _segment_events(block, threshold, gap_periods):
+    """
+    Splits every column of a (time x elements) array into events in one pass.
+    Returns (column, first, last, peak, total) arrays with one entry per event,
+    ordered by column and then by time. `first` and `last` are the rows of the
+    first and last value above the threshold; `total` is the sum of all values
+    from `first` to `last`, including the ones in gaps shorter than `gap_periods`.
+    """
+    n_periods, n_columns = block.shape
+    columns, rows = np.nonzero((block > threshold).T)
+    if not rows.size:
+        empty = np.zeros(0, dtype=np.int64)
+        return empty, empty, empty, np.zeros(0), np.zeros(0)
+
+    # A value above the threshold opens a new event unless the previous one in its
+    # column lies less than gap_periods dry periods before it
+    starts = np.ones(rows.size, dtype=bool)
+    starts[1:] = (columns[1:] != columns[:-1]) | (rows[1:] - rows[:-1] > gap_periods)
+    starts = np.flatnonzero(starts)
+    ends = np.append(starts[1:], rows.size) - 1
+    column, first, last = columns[starts], rows[starts], rows[ends]
+
+    # Every value from the first to the last row of an event, gaps included, in
+    # (column, time) order; events then are consecutive runs of known length
+    marks = np.zeros((n_columns, n_periods + 1), dtype=np.int8)
+    marks[column, first] = 1
+    marks[column, last + 1] = -1
+    inside = np.cumsum(marks[:, :-1], axis=1, dtype=np.int8).view(bool)
+    values = block.T[inside]
+    lengths = last - first + 1
+    offsets = np.cumsum(lengths) - lengths
+    return column, first, last, np.maximum.reduceat(values, offsets), np.add.reduceat(values, offsets)
+
+
+def _rank_events(column, peak, volume, duration, n, n_columns):
+    """
+    The n largest events of every column by peak, ties in input order.
+    Returns ((n x elements) peaks, volumes, durations in descending peak order with
+    NaN where a column has fewer events, events per column).
+    """
+    counts = np.bincount(column, minlength=n_columns)
+    ranked = [np.full((n, n_columns), np.nan) for _ in range(3)]
+    if n and column.size:
+        order = np.lexsort((-peak, column))
+        column_sorted = column[order]
+        rank = np.arange(order.size) - (np.cumsum(counts) - counts)[column_sorted]
+        keep = rank < n
+        for target, values in zip(ranked, (peak, volume, duration)):
+            target[rank[keep], column_sorted[keep]] = values[order[keep]]
+    return ranked, counts
+
+
+def event_statistics(block, events, step_seconds, n_max=0, n_min=0, chunk_columns=CHUNK_COLUMNS):
+    """
+    peak_statistics on independent events instead of local maxima: every column of a
+    (time x elements) array is split into events (see EventDefinition) and the events
+    are ranked by their peak. The returned dict has the keys of peak_statistics, with
+    "peaks" and "peak_counts" referring to events, plus
+        "volumes":   (n_max x elements) event volumes (sum of values x report step in seconds)
+        "durations": (n_max x elements) event durations in seconds
+    ranked like "peaks". The minima are those of the whole series.
+    """
+    block = np.asarray(block, dtype=np.float64)
+    stats = peak_statistics(block, n_min=n_min, chunk_columns=chunk_columns)
+    n_columns = block.shape[1]
+    gap_periods = events.gap_periods(step_seconds)
+
+    ranked = [np.full((n_max, n_columns), np.nan) for _ in range(3)]
+    counts = np.zeros(n_columns, dtype=np.int64)
+    for start in range(0, n_columns, chunk_columns):
+        columns = slice(start, start + chunk_columns)
+        chunk = block[:, columns]
+        column, first, last, peak, total = _segment_events(chunk, events.threshold, gap_periods)
+        chunk_ranked, counts[columns] = _rank_events(column, peak, total * step_seconds,
+                                                     (last - first + 1) * step_seconds, n_max, chunk.shape[1])
+        for target, values in zip(ranked, chunk_ranked):
+            target[:, columns] = values
+
+    stats.update(peaks=ranked[0], peak_counts=counts, volumes=ranked[1], durations=ranked[2])
+    return stats
+
+
+class EventAccumulator:
+    """
+    Running version of event_statistics for series that arrive in chunks of periods.
+    The event still open at the end of a chunk is carried over with its first and
+    last row, peak, value sum and the sum of the dry values after it, and is merged
+    with the first event of the next chunk when the gap between them is shorter than
+    the minimum inter-event time. Peaks, durations and counts are identical to
+    event_statistics on the concatenated series, volumes equal up to rounding.
+    """
+
+    def __init__(self, n_columns, events, step_seconds, n_max=0, n_min=0):
+        self.threshold = events.threshold
+        self.gap_periods = events.gap_periods(step_seconds)
+        self.step_seconds = step_seconds
+        self.n_max = n_max
+        self.n_columns = n_columns
+        # Minima of the whole series
+        self.values = PeakAccumulator(n_columns, n_min=n_min)
+        self.event_counts = np.zeros(n_columns, dtype=np.int64)
+        self.top = (np.zeros(0, dtype=np.int64), np.zeros(0), np.zeros(0), np.zeros(0))
+        # Event still open in every column: first / last row (-1 if none), peak, value sum, dry sum after it
+        self.open_first = np.full(n_columns, -1, dtype=np.int64)
+        self.open_last = np.full(n_columns, -1, dtype=np.int64)
+        self.open_peak = np.zeros(n_columns)
+        self.open_total = np.zeros(n_columns)
+        self.open_dry = np.zeros(n_columns)
+
+    @property
+    def n_periods(self):
+        return self.values.n_periods
+
+    def _close(self, column, first, last, peak, total):
+        """
+        Adds finished events to the running top n_max of their columns.
+        """
+        self.event_counts += np.bincount(column, minlength=self.n_columns)
+        top_column, top_peak, top_total, top_length = self.top
+        column = np.concatenate([top_column, column])
+        peak = np.concatenate([top_peak, peak])
+        total = np.concatenate([top_total, total])
+        length = np.concatenate([top_length, last - first + 1])
+        order = np.lexsort((-peak, column))
+        counts = np.bincount(column, minlength=self.n_columns)
+        rank = np.arange(order.size) - (np.cumsum(counts) - counts)[column[order]]
+        keep = order[rank < self.n_max]
+        self.top = (column[keep], peak[keep], total[keep], length[keep])
+
+    def update(self, chunk):
+        """
+        Adds the next (periods x elements) chunk of the open segment.
+        """
+        chunk = np.asarray(chunk, dtype=np.float64)
+        n_rows = chunk.shape[0]
+        if not n_rows:
+            return
+        offset = self.values.n_periods
+        self.values.update(chunk)
+
+        column, first, last, peak, total = _segment_events(chunk, self.threshold, self.gap_periods)
+        first += offset
+        last += offset
+        rows = np.arange(offset, offset + n_rows)[:, None]
+        is_open = self.open_last >= 0
+
+        # First event of every column in this chunk (-1 if none), its row and the values before it
+        first_event = np.full(self.n_columns, -1, dtype=np.int64)
+        leading = np.ones(column.size, dtype=bool)
+        leading[1:] = column[1:] != column[:-1]
+        first_event[column[leading]] = np.flatnonzero(leading)
+        first_row = np.full(self.n_columns, offset + n_rows, dtype=np.int64)
+        first_row[column[leading]] = first[leading]
+        before_first = np.where(rows < first_row, chunk, 0.0).sum(axis=0)
+
+        # Open events that continue into the first event of their column
+        merge = is_open & (first_event >= 0) & (first_row - self.open_last - 1 < self.gap_periods)
+        merged = first_event[merge]
+        first[merged] = self.open_first[merge]
+        peak[merged] = np.maximum(peak[merged], self.open_peak[merge])
+        total[merged] += self.open_total[merge] + self.open_dry[merge] + before_first[merge]
+
+        # Open events followed by a separate event are finished
+        ended = is_open & (first_event >= 0) & ~merge
+        self._close(np.flatnonzero(ended), self.open_first[ended], self.open_last[ended], self.open_peak[ended],
+                    self.open_total[ended])
+        # Open events without any event in this chunk stay open
+        idle = is_open & (first_event < 0)
+        self.open_dry[idle] += before_first[idle]
+
+        # The last event of every column stays open, the others are finished
+        trailing = np.ones(column.size, dtype=bool)
+        trailing[:-1] = column[:-1] != column[1:]
+        finished = ~trailing
+        self._close(column[finished], first[finished], last[finished], peak[finished], total[finished])
+        columns = column[trailing]
+        self.open_first[columns] = first[trailing]
+        self.open_last[columns] = last[trailing]
+        self.open_peak[columns] = peak[trailing]
+        self.open_total[columns] = total[trailing]
+        self.open_dry[columns] = np.where(rows > self.open_last, chunk, 0.0).sum(axis=0)[columns]
+
+    def end_segment(self):
+        """
+        Closes the open segment; the events still open end with it.
+        """
+        self.values.end_segment()
+        is_open = self.open_last >= 0
+        self._close(np.flatnonzero(is_open), self.open_first[is_open], self.open_last[is_open],
+                    self.open_peak[is_open], self.open_total[is_open])
+        self.open_first[:] = -1
+        self.open_last[:] = -1
+
+    def result(self):
+        """
+        The statistics so far, in the format of event_statistics.
+        """
+        is_open = self.open_last >= 0
+        column, peak, total, length = self.top
+        column = np.concatenate([column, np.flatnonzero(is_open)])
+        peak = np.concatenate([peak, self.open_peak[is_open]])
+        volume = np.concatenate([total, self.open_total[is_open]]) * self.step_seconds
+        duration = np.concatenate([length, self.open_last[is_open] - self.open_first[is_open] + 1]) * self.step_seconds
+        ranked, _ = _rank_events(column, peak, volume, duration, self.n_max, self.n_columns)
+        stats = self.values.result()
+        stats.update(peaks=ranked[0], peak_counts=self.event_counts + is_open, volumes=ranked[1],
+                     durations=ranked[2])
+        return stats
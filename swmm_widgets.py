@@ -0,0 +1,231 @@
+import re
+import bisect
+import tkinter as tk
+from tkinter import ttk
+
+# Tk widgets shared by the GUI windows. Only tkinter is imported here, so this
+# module can be loaded before the main window is built.
+
+# Rows scrolled per mouse wheel notch
+WHEEL_ROWS = 3
+
+# Row height assumed before the Treeview style reports one
+DEFAULT_ROW_HEIGHT = 20
+
+# Milliseconds to wait after the last keystroke before filtering
+SEARCH_DELAY_MS = 150
+
+CHECKED = "☑"
+UNCHECKED = "☐"
+
+
+class SearchableSelector(tk.Frame):
+    """
+    Searchable multi-selection list for large numbers of items (nodes, .OUT files).
+    The ttk.Treeview only ever holds the rows that fit in it: the scrollbar, the
+    mouse wheel and the arrow keys move a window over the matches, and the rows
+    of that window are re-inserted, so tens of thousands of items cost no widgets
+    and every match stays reachable by scrolling.
+    Prefix searches are answered from a sorted index of the names; with "Regex"
+    checked the search is a case-insensitive regular expression instead.
+    The selection is a set of item positions, independent of what is shown.
+    """
+
+    def __init__(self, master, items, title, height=10, bg="#2E2E2E", fg="white", button_bg="#4A4A4A"):
+        super().__init__(master, bg=bg)
+        self.items = list(items)
+        self.texts = [str(item) for item in self.items]
+        self.selected = set()
+        self.matches = list(range(len(self.items)))
+        # First match shown and number of rows that fit in the tree
+        self.offset = 0
+        self.visible_rows = height
+
+        # Sorted index for prefix searches
+        self._sorted_positions = sorted(range(len(self.texts)), key=lambda i: self.texts[i].lower())
+        self._sorted_keys = [self.texts[i].lower() for i in self._sorted_positions]
+        self._pending_search = None
+
+        header = tk.Frame(self, bg=bg)
+        header.pack(fill='x')
+        tk.Label(header, text=title, bg=bg, fg=fg).pack(side=tk.LEFT, padx=5)
+
+        self.search_var = tk.StringVar()
+        self.search_var.trace_add("write", lambda *args: self._schedule_search())
+        tk.Entry(header, textvariable=self.search_var, bg=button_bg, fg=fg, insertbackground=fg,
+                 width=30).pack(side=tk.LEFT, padx=5)
+
+        self.regex_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(header, text="Regex", variable=self.regex_var, command=self.refresh, bg=bg, fg=fg,
+                       selectcolor=button_bg).pack(side=tk.LEFT, padx=5)
+
+        tree_frame = tk.Frame(self, bg=bg)
+        tree_frame.pack(fill='both', expand=True)
+        self.tree = ttk.Treeview(tree_frame, columns=("name",), show="tree", height=height, selectmode="browse")
+        self.tree.column("#0", width=30, stretch=False)
+        self.tree.column("name", width=360)
+        self.scrollbar = ttk.Scrollbar(tree_frame, orient=tk.VERTICAL, command=self._on_scrollbar)
+        self.tree.pack(side=tk.LEFT, fill='both', expand=True)
+        self.scrollbar.pack(side=tk.RIGHT, fill='y')
+        self.tree.bind("<ButtonRelease-1>", self._on_click)
+        self.tree.bind("<space>", self._on_space)
+        self.tree.bind("<Up>", lambda event: self._on_arrow(-1))
+        self.tree.bind("<Down>", lambda event: self._on_arrow(1))
+        self.tree.bind("<Prior>", lambda event: self.scroll_to(self.offset - self.visible_rows) or "break")
+        self.tree.bind("<Next>", lambda event: self.scroll_to(self.offset + self.visible_rows) or "break")
+        self.tree.bind("<MouseWheel>", self._on_wheel)
+        self.tree.bind("<Button-4>", lambda event: self.scroll_to(self.offset - WHEEL_ROWS) or "break")
+        self.tree.bind("<Button-5>", lambda event: self.scroll_to(self.offset + WHEEL_ROWS) or "break")
+        self.tree.bind("<Configure>", self._on_resize)
+
+        footer = tk.Frame(self, bg=bg)
+        footer.pack(fill='x')
+        tk.Button(footer, text="Select All", command=self.select_matches, bg=button_bg, fg=fg).pack(side=tk.LEFT, padx=5, pady=2)
+        tk.Button(footer, text="Clear", command=self.clear_matches, bg=button_bg, fg=fg).pack(side=tk.LEFT, padx=5, pady=2)
+        self.status_label = tk.Label(footer, bg=bg, fg=fg)
+        self.status_label.pack(side=tk.LEFT, padx=5)
+
+        self.refresh()
+
+    def find(self, pattern, regex=False):
+        """
+        Positions of the items matching `pattern`: a case-insensitive prefix, or a
+        regular expression when `regex` is True. An empty pattern matches every item
+        in its original order. Raises re.error for an invalid expression.
+        """
+        if not pattern:
+            return list(range(len(self.items)))
+        if regex:
+            expression = re.compile(pattern, re.IGNORECASE)
+            return [i for i, text in enumerate(self.texts) if expression.search(text)]
+
+        prefix = pattern.lower()
+        start = bisect.bisect_left(self._sorted_keys, prefix)
+        stop = bisect.bisect_left(self._sorted_keys, prefix + "\uffff", start)
+        return self._sorted_positions[start:stop]
+
+    def _schedule_search(self):
+        if self._pending_search is not None:
+            self.after_cancel(self._pending_search)
+        self._pending_search = self.after(SEARCH_DELAY_MS, self.refresh)
+
+    def refresh(self):
+        """
+        Re-runs the search and shows the matches from the top.
+        """
+        self._pending_search = None
+        try:
+            self.matches = self.find(self.search_var.get(), self.regex_var.get())
+        except re.error as e:
+            self.matches = []
+            self.scroll_to(0)
+            self.status_label.config(text=f"Invalid pattern: {e}")
+            return
+
+        self.scroll_to(0)
+        self._update_status()
+
+    def scroll_to(self, offset):
+        """
+        Shows the matches from position `offset` on (clamped to the list) in the rows
+        of the tree and updates the scrollbar.
+        """
+        n_matches = len(self.matches)
+        self.offset = max(0, min(int(offset), n_matches - self.visible_rows))
+        self.tree.delete(*self.tree.get_children())
+        for i in self.matches[self.offset:self.offset + self.visible_rows]:
+            self.tree.insert("", tk.END, iid=str(i), text=CHECKED if i in self.selected else UNCHECKED,
+                             values=(self.texts[i],))
+        if n_matches:
+            self.scrollbar.set(self.offset / n_matches, min(1.0, (self.offset + self.visible_rows) / n_matches))
+        else:
+            self.scrollbar.set(0.0, 1.0)
+
+    def _on_scrollbar(self, action, amount, unit=None):
+        if action == "moveto":
+            self.scroll_to(round(float(amount) * len(self.matches)))
+        elif action == "scroll":
+            step = self.visible_rows if unit == "pages" else 1
+            self.scroll_to(self.offset + int(amount) * step)
+
+    def _on_wheel(self, event):
+        # Windows reports multiples of 120 per notch, macOS small deltas
+        notches = event.delta // 120 if abs(event.delta) >= 120 else event.delta
+        self.scroll_to(self.offset - notches * WHEEL_ROWS)
+        return "break"
+
+    def _on_arrow(self, step):
+        """
+        Moves the focus one row, scrolling when it would leave the window.
+        """
+        rows = self.tree.get_children()
+        if not rows:
+            return "break"
+        focus = self.tree.focus()
+        position = self.offset + (rows.index(focus) if focus in rows else 0) + step
+        position = max(0, min(position, len(self.matches) - 1))
+        if not self.offset <= position < self.offset + len(rows):
+            self.scroll_to(self.offset + step)
+        row = str(self.matches[position])
+        if self.tree.exists(row):
+            self.tree.focus(row)
+            self.tree.selection_set(row)
+        return "break"
+
+    def _on_resize(self, event):
+        row_height = int(ttk.Style().lookup("Treeview", "rowheight") or DEFAULT_ROW_HEIGHT)
+        visible_rows = max(1, event.height // row_height)
+        if visible_rows != self.visible_rows:
+            self.visible_rows = visible_rows
+            self.scroll_to(self.offset)
+
+    def _update_status(self):
+        self.status_label.config(text=f"{len(self.selected)} selected, "
+                                      f"{len(self.matches)} of {len(self.items)} match")
+
+    def _toggle(self, row):
+        i = int(row)
+        if i in self.selected:
+            self.selected.discard(i)
+        else:
+            self.selected.add(i)
+        self.tree.item(row, text=CHECKED if i in self.selected else UNCHECKED)
+        self._update_status()
+
+    def _on_click(self, event):
+        row = self.tree.identify_row(event.y)
+        if row:
+            self._toggle(row)
+
+    def _on_space(self, event):
+        row = self.tree.focus()
+        if row:
+            self._toggle(row)
+
+    def _set_matches(self, selected):
+        if selected:
+            self.selected.update(self.matches)
+        else:
+            self.selected.difference_update(self.matches)
+        mark = CHECKED if selected else UNCHECKED
+        for row in self.tree.get_children():
+            self.tree.item(row, text=mark)
+        self._update_status()
+
+    def select_matches(self):
+        """
+        Adds every item matching the current search (scrolled into view or not) to the selection.
+        """
+        self._set_matches(True)
+
+    def clear_matches(self):
+        """
+        Removes every item matching the current search from the selection.
+        """
+        self._set_matches(False)
+
+    def get_selected(self):
+        """
+        Selected items in their original order.
+        """
+        return [self.items[i] for i in sorted(self.selected)]
@@ -0,0 +1,160 @@
+import numpy as np
+import pytest
+
+from swmm_stats import (local_maxima_mask, peak_statistics, PeakAccumulator, EventDefinition, event_statistics,
+                        EventAccumulator)
+
+find_peaks = pytest.importorskip("scipy.signal").find_peaks
+
+STEP_SECONDS = 900.0
+
+
+def series():
+    """
+    Random series with many ties (rounded values) plus hand-made plateau and edge cases.
+    """
+    rng = np.random.default_rng(7)
+    cases = [np.round(rng.normal(0, 1, rng.integers(0, 300)), 1) for _ in range(40)]
+    cases += [np.array(values, dtype=float) for values in (
+        [], [1], [1, 2], [2, 1], [1, 1, 1],
+        [0, 1, 2, 3], [3, 2, 1, 0],
+        [2, 2, 1, 0], [0, 1, 2, 2],
+        [0, 1, 1, 0], [0, 1, 1, 1, 0], [0, 1, 1, 2, 2, 0],
+        [0, 2, 2, 1, 1, 3, 0], [1, 0, 1, 0, 1],
+    )]
+    return cases
+
+
+def reference_peaks(column, n_max):
+    values = -np.sort(-column[find_peaks(column)[0]])
+    return np.concatenate([values[:n_max], np.full(max(0, n_max - len(values)), np.nan)]), len(values)
+
+
+def reference_events(column, events, n_max):
+    """
+    (peak, volume, duration) of the n_max largest events of one series, plain Python.
+    """
+    gap = events.gap_periods(STEP_SECONDS)
+    spans = []
+    for i, value in enumerate(column):
+        if value > events.threshold:
+            if spans and i - spans[-1][1] - 1 < gap:
+                spans[-1][1] = i
+            else:
+                spans.append([i, i])
+    found = [(column[a:b + 1].max(), column[a:b + 1].sum() * STEP_SECONDS, (b - a + 1) * STEP_SECONDS)
+             for a, b in spans]
+    found.sort(key=lambda event: -event[0])
+    return found[:n_max], len(spans)
+
+
+def feed(accumulator, block, rng, max_chunk):
+    position = 0
+    while position < block.shape[0]:
+        size = int(rng.integers(1, max_chunk + 1))
+        accumulator.update(block[position:position + size])
+        position += size
+
+
+def assert_same(actual, expected, keys):
+    for key in keys:
+        np.testing.assert_array_equal(actual[key], expected[key], err_msg=key)
+
+
+@pytest.mark.parametrize("column", series())
+def test_local_maxima_mask_matches_find_peaks(column):
+    mask = local_maxima_mask(column[:, None])
+    np.testing.assert_array_equal(np.flatnonzero(mask[:, 0]), find_peaks(column)[0])
+
+
+def test_peak_statistics_matches_sorted_find_peaks():
+    columns = [column for column in series() if len(column)]
+    # Equal lengths, so the padding cannot create peaks
+    n_periods = min(len(column) for column in columns)
+    block = np.column_stack([column[:n_periods] for column in columns])
+    stats = peak_statistics(block, n_max=4, n_min=3, chunk_columns=5)
+    for j in range(block.shape[1]):
+        peaks, count = reference_peaks(block[:, j], 4)
+        np.testing.assert_array_equal(stats["peaks"][:, j], peaks)
+        assert stats["peak_counts"][j] == count
+
+
+@pytest.mark.parametrize("column", series())
+def test_minima_match_sort(column):
+    stats = peak_statistics(column[:, None], n_min=4)
+    expected = np.sort(column)[:4]
+    np.testing.assert_array_equal(stats["minima"][:, 0], np.pad(expected, (0, 4 - len(expected)),
+                                                                 constant_values=np.nan))
+    np.testing.assert_array_equal(stats["minimum"][0], column.min() if len(column) else np.nan)
+
+
+@pytest.mark.parametrize("max_chunk", [1, 2, 7, 64])
+def test_peak_accumulator_matches_block(max_chunk):
+    rng = np.random.default_rng(max_chunk)
+    block = np.round(rng.normal(0, 1, (500, 6)), 1)
+    # Plateaus spanning several chunks
+    block[100:140, 0] = 5.0
+    block[200:260, 1] = -5.0
+    accumulator = PeakAccumulator(block.shape[1], n_max=5, n_min=3, chunk_columns=4)
+    feed(accumulator, block, rng, max_chunk)
+    assert_same(accumulator.result(), peak_statistics(block, n_max=5, n_min=3),
+                ("peaks", "peak_counts", "minimum", "minima"))
+    assert accumulator.n_periods == block.shape[0]
+
+
+def test_peak_accumulator_segments_are_separate_series():
+    rng = np.random.default_rng(3)
+    first, second = np.round(rng.normal(0, 1, (2, 120, 3)), 1)
+    # A rise at the end of the first segment and a fall at the start of the second is no peak
+    first[-1], second[0] = 9.0, 8.0
+    accumulator = PeakAccumulator(3, n_max=100, n_min=2)
+    feed(accumulator, first, rng, 16)
+    accumulator.end_segment()
+    feed(accumulator, second, rng, 16)
+    stats = accumulator.result()
+    for j in range(3):
+        values = np.concatenate([first[find_peaks(first[:, j])[0], j], second[find_peaks(second[:, j])[0], j]])
+        assert stats["peak_counts"][j] == len(values)
+        np.testing.assert_array_equal(stats["peaks"][:len(values), j], -np.sort(-values))
+
+
+@pytest.mark.parametrize("threshold, min_gap_hours", [(0.0, 0.0), (0.5, 1.0), (-0.3, 6.0)])
+def test_event_statistics_matches_reference(threshold, min_gap_hours):
+    rng = np.random.default_rng(11)
+    events = EventDefinition(threshold, min_gap_hours)
+    block = np.round(rng.normal(0, 1, (400, 5)), 1)
+    stats = event_statistics(block, events, STEP_SECONDS, n_max=4, n_min=2, chunk_columns=2)
+    for j in range(block.shape[1]):
+        found, count = reference_events(block[:, j], events, 4)
+        assert stats["peak_counts"][j] == count
+        for k in range(4):
+            if k < len(found):
+                peak, volume, duration = found[k]
+                assert stats["peaks"][k, j] == peak
+                assert stats["durations"][k, j] == duration
+                assert np.isclose(stats["volumes"][k, j], volume)
+            else:
+                assert np.isnan(stats["peaks"][k, j])
+
+
+@pytest.mark.parametrize("max_chunk", [1, 3, 16, 100])
+def test_event_accumulator_matches_block(max_chunk):
+    rng = np.random.default_rng(max_chunk)
+    events = EventDefinition(0.5, 1.0)
+    block = np.round(rng.normal(0, 1, (600, 4)), 1)
+    # Long events and inter-event gaps that span chunk boundaries
+    block[50:250, 0] = 2.0
+    block[300:302, 1] = 3.0
+    block[302:305, 1] = 0.0
+    block[305:307, 1] = 3.0
+    block[:, 2] = 0.0
+    block[[10, 400], 2] = 1.0
+    accumulator = EventAccumulator(block.shape[1], events, STEP_SECONDS, n_max=5, n_min=2)
+    feed(accumulator, block, rng, max_chunk)
+    expected = event_statistics(block, events, STEP_SECONDS, n_max=5, n_min=2)
+    # Still open at the end of the data
+    assert_same(accumulator.result(), expected, ("peaks", "peak_counts", "durations", "minimum", "minima"))
+    accumulator.end_segment()
+    stats = accumulator.result()
+    assert_same(stats, expected, ("peaks", "peak_counts", "durations", "minimum", "minima"))
+    np.testing.assert_allclose(stats["volumes"], expected["volumes"])